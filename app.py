@@ -1,4 +1,6 @@
-from typing import Dict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+import asyncio
+import threading
 import re
 import streamlit as st
 from pathlib import Path
@@ -40,6 +42,86 @@ def extract_proposal_sections(proposal_text: str) -> Dict[str, str]:
         sections[section_num] = content
     return sections
 
+def build_match_prompt(req: Dict[str, Any], proposal_text: str) -> str:
+    """Build the proposal-matching prompt for a single SOW requirement."""
+    return f"""You are a requirements analysis assistant. Find the section in the proposal that best matches this SOW requirement. Look for section numbers in the format X.X.X or X.X at the start of paragraphs. Return ONLY a JSON object with no additional text.
+SOW Requirement (Section {req['section_id']}):
+{req['text']}
+Proposal Text:
+{proposal_text}
+Return a JSON object with these exact fields:
+{{
+    "matched_section": "The exact section number found in the proposal (e.g., 1.1.1, 2.3, etc.). If no numbered section matches, return 'N/A'",
+    "matched_text": "The exact text from that section that addresses this requirement",
+    "compliance": "Fully Compliant" or "Partially Compliant" or "Not Addressed",
+    "confidence": A number between 0 and 1 indicating match confidence,
+    "suggestions": ["List", "of", "improvement", "suggestions"]
+}}"""
+
+async def request_match_analyses(client: anthropic.AsyncAnthropic,
+                                 prompts: List[str],
+                                 max_concurrency: int = 5,
+                                 max_retries: int = 3) -> AsyncIterator[Tuple[int, Any]]:
+    """Send one analysis request per prompt concurrently.
+    
+    At most max_concurrency requests are in flight at once, and rate-limited
+    requests are retried with exponential backoff. Yields (prompt index,
+    response) pairs as requests complete; a request that still fails is
+    yielded as its exception.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def request(index: int, prompt: str):
+        try:
+            async with semaphore:
+                for attempt in range(max_retries + 1):
+                    try:
+                        return index, await client.messages.create(
+                            model="claude-3-opus-20240229",
+                            max_tokens=1000,
+                            messages=[{
+                                "role": "user",
+                                "content": prompt
+                            }]
+                        )
+                    except anthropic.RateLimitError:
+                        if attempt == max_retries:
+                            raise
+                        await asyncio.sleep(2 ** attempt)
+        except Exception as e:
+            return index, e
+    
+    for next_result in asyncio.as_completed(
+        [request(index, prompt) for index, prompt in enumerate(prompts)]
+    ):
+        yield await next_result
+
+def get_async_runtime(api_key: str) -> Tuple[anthropic.AsyncAnthropic, asyncio.AbstractEventLoop]:
+    """Get the session's async Anthropic client and the event loop it runs on.
+    
+    The loop runs in a background thread, so requests can be scheduled even
+    when the calling thread already has a running loop, and the client's
+    connection pool is reused across reruns.
+    """
+    if 'event_loop' not in st.session_state:
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+        st.session_state.event_loop = loop
+    if 'async_client' not in st.session_state:
+        st.session_state.async_client = anthropic.AsyncAnthropic(api_key=api_key)
+    return st.session_state.async_client, st.session_state.event_loop
+
+def iterate_in_loop(results: AsyncIterator, loop: asyncio.AbstractEventLoop) -> Iterator:
+    """Consume an async iterator running on loop from synchronous code."""
+    async def next_item():
+        return await results.__anext__()
+    
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(next_item(), loop).result()
+        except StopAsyncIteration:
+            return
+
 def init_temp_dir() -> Path:
     """Initialize temp directory."""
     if 'temp_dir' not in st.session_state:
@@ -76,8 +158,6 @@ def main():
     # Initialize session state
     if 'initialized' not in st.session_state:
         st.session_state.processor = SOWProcessor()
-        if has_api:
-            st.session_state.client = anthropic.Anthropic(api_key=api_key)
         st.session_state.requirements = None
         st.session_state.proposal_text = None
         st.session_state.analysis_results = None
@@ -286,43 +366,48 @@ def main():
                             # Create a placeholder for the live results table
                             results_table = st.empty()
                             
-                            for i, req in enumerate(requirements, 1):
+                            # Get proposal text directly from session state
+                            proposal_text = st.session_state.proposal_text
+                            if not proposal_text:
+                                st.error("No proposal text found in session state")
+                                proposal_text = ""
+                            
+                            # Analyze every requirement with Claude concurrently,
+                            # handling each response as soon as it arrives
+                            if has_api:
+                                analysis_status.write(f"Sending {total_reqs} requirements for analysis...")
+                                client, loop = get_async_runtime(api_key)
+                                responses = iterate_in_loop(
+                                    request_match_analyses(
+                                        client,
+                                        [build_match_prompt(req, proposal_text) for req in requirements]
+                                    ),
+                                    loop
+                                )
+                            else:
+                                st.error("Cannot analyze proposal without ANTHROPIC_API_KEY")
+                                responses = []
+                            
+                            # Responses arrive in completion order; remember each
+                            # result's requirement index to restore document order
+                            order = []
+                            for i, (index, response) in enumerate(responses, 1):
+                                req = requirements[index]
+                                order.append(index)
                                 progress = i / total_reqs
                                 progress_bar.progress(progress)
                                 analysis_status.write(f"Analyzing requirement {i} of {total_reqs} ({int(progress * 100)}%)")
-                                # Analyze with Claude
-                                # Get proposal text directly from session state
-                                proposal_text = st.session_state.proposal_text
-                                if not proposal_text:
-                                    st.error("No proposal text found in session state")
-                                    proposal_text = ""
-                                
-                                prompt = f"""You are a requirements analysis assistant. Find the section in the proposal that best matches this SOW requirement. Look for section numbers in the format X.X.X or X.X at the start of paragraphs. Return ONLY a JSON object with no additional text.
-SOW Requirement (Section {req['section_id']}):
-{req['text']}
-Proposal Text:
-{proposal_text}
-Return a JSON object with these exact fields:
-{{
-    "matched_section": "The exact section number found in the proposal (e.g., 1.1.1, 2.3, etc.). If no numbered section matches, return 'N/A'",
-    "matched_text": "The exact text from that section that addresses this requirement",
-    "compliance": "Fully Compliant" or "Partially Compliant" or "Not Addressed",
-    "confidence": A number between 0 and 1 indicating match confidence,
-    "suggestions": ["List", "of", "improvement", "suggestions"]
-}}"""
                                 
-                                if has_api:
-                                    response = st.session_state.client.messages.create(
-                                        model="claude-3-opus-20240229",
-                                        max_tokens=1000,
-                                        messages=[{
-                                            "role": "user",
-                                            "content": prompt
-                                        }]
-                                    )
-                                else:
-                                    st.error("Cannot analyze proposal without ANTHROPIC_API_KEY")
-                                    break
+                                if isinstance(response, Exception):
+                                    st.error(f"Error analyzing requirement {req['section_id']}: {str(response)}")
+                                    results.append({
+                                        **req,
+                                        'matched_text': '',
+                                        'compliance': 'Error',
+                                        'match_confidence': 0.0,
+                                        'suggestions': []
+                                    })
+                                    continue
                                 
                                 try:
                                     # Extract JSON from response
@@ -403,7 +488,9 @@ Return a JSON object with these exact fields:
                             
                             progress_bar.progress(1.0)
                             analysis_status.write("Analysis complete!")
-                            st.session_state.analysis_results = results
+                            st.session_state.analysis_results = [
+                                results[j] for j in sorted(range(len(results)), key=order.__getitem__)
+                            ]
                     
                     # Display analysis results
                     df = pd.DataFrame(st.session_state.analysis_results)
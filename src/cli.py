@@ -7,14 +7,41 @@ import sys
 import logging
 import argparse
 import json
-from typing import Optional
+import importlib
+import orjson
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Union
 from pathlib import Path
 
-from src.main import RAGSystem, SystemConfig
-from src.llm.rag_manager import RAGManager, RAGConfig
-
 logger = logging.getLogger(__name__)
 
+# The RAG stack pulls in torch, spaCy and the Neo4j driver; import it only
+# when a command needs it so --help and argument errors return immediately
+_LAZY_IMPORTS = {
+    "RAGSystem": "src.main",
+    "SystemConfig": "src.main",
+    "RAGManager": "src.llm.rag_manager",
+    "RAGConfig": "src.llm.rag_manager",
+}
+
+def __getattr__(name: str):
+    """Import heavy dependencies on first access (PEP 562)."""
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+def _lazy(name: str):
+    """Return a lazily imported dependency, honouring any already bound value."""
+    try:
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
+
+_ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
 def setup_logging(verbose: bool = False):
     """Setup logging configuration.
     
@@ -29,6 +56,8 @@ def setup_logging(verbose: bool = False):
 def load_config(config_path: Optional[str] = None) -> dict:
     """Load configuration from file.
     
+    Parsed files are cached until their modification time changes.
+    
     Args:
         config_path: Path to config file
         
@@ -42,8 +71,8 @@ def load_config(config_path: Optional[str] = None) -> dict:
         )
     
     try:
-        with open(config_path) as f:
-            return json.load(f)
+        resolved = Path(config_path).resolve()
+        return dict(_read_config(str(resolved), resolved.stat().st_mtime_ns))
     except FileNotFoundError:
         logger.warning(f"Config file not found at {config_path}, using defaults")
         return {}
@@ -51,6 +80,39 @@ def load_config(config_path: Optional[str] = None) -> dict:
         logger.error(f"Invalid JSON in config file: {config_path}")
         raise
 
+def read_documents(stream: TextIO) -> Union[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+    """Read documents from a JSON array or newline-delimited JSON stream.
+    
+    A JSON array is parsed whole. Newline-delimited JSON is parsed lazily,
+    one record per line, so large inputs never sit in memory all at once.
+    
+    Args:
+        stream: Text stream to read from
+        
+    Returns:
+        List of documents, or an iterator over them for NDJSON input
+    """
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+        
+    if first in ('[', ''):
+        return orjson.loads(first + stream.read())
+    return _iter_ndjson(first + stream.readline(), stream)
+
+def _iter_ndjson(first_line: str, stream: TextIO) -> Iterator[Dict[str, Any]]:
+    """Yield one parsed record per non-blank line."""
+    yield orjson.loads(first_line)
+    for line in stream:
+        if line.strip():
+            yield orjson.loads(line)
+
+@lru_cache(maxsize=8)
+def _read_config(path: str, mtime_ns: int) -> dict:
+    """Parse a config file; the mtime in the key invalidates stale entries."""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
 def process_documents(args, config: dict):
     """Process documents and add to knowledge base.
     
@@ -59,19 +121,22 @@ def process_documents(args, config: dict):
         config: Configuration dictionary
     """
     # Initialize system
-    system = RAGSystem(SystemConfig(**config))
+    system = _lazy("RAGSystem")(_lazy("SystemConfig")(**config))
     
     try:
         # Load documents
         if args.file:
-            with open(args.file) as f:
-                documents = json.load(f)
+            with open(args.file, 'rb') as f:
+                documents = orjson.loads(f.read())
         else:
-            # Read from stdin
-            documents = json.load(sys.stdin)
+            # Read from stdin, streaming NDJSON input record by record
+            documents = read_documents(sys.stdin)
             
         # Process documents
-        logger.info(f"Processing {len(documents)} documents...")
+        if isinstance(documents, list):
+            logger.info(f"Processing {len(documents)} documents...")
+        else:
+            logger.info("Processing streamed documents...")
         processed = system.process_documents(
             documents,
             source=args.source or "cli_input"
@@ -80,8 +145,8 @@ def process_documents(args, config: dict):
         logger.info(f"Successfully processed {len(processed)} documents")
         
         if args.output:
-            with open(args.output, 'w') as f:
-                json.dump(processed, f, indent=2)
+            with open(args.output, 'wb') as f:
+                f.write(orjson.dumps(processed, option=_ORJSON_OPTIONS))
                 
     finally:
         system.close()
@@ -94,10 +159,10 @@ def query_knowledge_base(args, config: dict):
         config: Configuration dictionary
     """
     # Initialize system
-    system = RAGSystem(SystemConfig(**config))
+    system = _lazy("RAGSystem")(_lazy("SystemConfig")(**config))
     
     # Initialize RAG manager
-    rag_config = RAGConfig(
+    rag_config = _lazy("RAGConfig")(
         temperature=args.temperature,
         max_tokens=args.max_tokens,
         top_k_results=args.top_k
@@ -108,7 +173,7 @@ def query_knowledge_base(args, config: dict):
         logger.error("ANTHROPIC_API_KEY environment variable not set")
         sys.exit(1)
         
-    manager = RAGManager(
+    manager = _lazy("RAGManager")(
         search_engine=system.search_engine,
         anthropic_api_key=anthropic_api_key,
         config=rag_config
@@ -136,8 +201,8 @@ def query_knowledge_base(args, config: dict):
         result = manager.format_response(response)
         
         if args.output:
-            with open(args.output, 'w') as f:
-                json.dump(result, f, indent=2)
+            with open(args.output, 'wb') as f:
+                f.write(orjson.dumps(result, option=_ORJSON_OPTIONS))
         else:
             # Pretty print to stdout
             print("\nAnswer:")
@@ -152,7 +217,7 @@ def query_knowledge_base(args, config: dict):
                     
             if args.show_metadata:
                 print("\nMetadata:")
-                print(json.dumps(result["metadata"], indent=2))
+                print(orjson.dumps(result["metadata"], option=_ORJSON_OPTIONS).decode())
                 
     finally:
         system.close()
@@ -1,34 +1,144 @@
 import re
 import pandas as pd
-import spacy
 import pdfplumber
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from functools import lru_cache
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
-import subprocess
-import sys
+import hashlib
 
-# Load spaCy model
 try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    subprocess.check_call([sys.executable, "-m", "spacy", "download", "en_core_web_sm"])
-    nlp = spacy.load("en_core_web_sm")
+    import ahocorasick
+except ImportError:  # Fall back to per-category regexes when pyahocorasick is not installed
+    ahocorasick = None
+
+# Compiled once at import; these run per line / per section on every document
+_PAGE_NOISE_RE = re.compile(r'(?:Source|Page|For Official Use Only|^\d+$)')
+_PAGE_SECTION_START_RE = re.compile(r'^[A-Z]\.(\d+)?')
+# Table-of-contents dot leaders ending in a page number, and PDF CID glyph
+# artifacts; a prose ellipsis ("shall... deliver") is left alone
+_INLINE_NOISE = r'\.{4,}[ \t]*\d+|\(cid:\d*\)'
+_INLINE_NOISE_RE = re.compile(_INLINE_NOISE)
+# Page header/footer lines plus inline noise, removed in a single pass
+_NOISE_RE = re.compile(
+    r'^.*?(?:Source|Page|For Official Use Only).*$\n?|' + _INLINE_NOISE,
+    re.MULTILINE
+)
+_WHITESPACE_RE = re.compile(r'\s+')
+# Section header line: lettered (A., C.1) or three-level numbered (3.2.1) ID,
+# optionally followed by a title on the same line
+_SECTION_HEADER_RE = re.compile(
+    r'^[ \t]*(?P<id>[A-Z]\.\d*|\d+\.\d+\.\d+)(?:[ \t]+(?P<title>[^\n]+))?[ \t]*$',
+    re.MULTILINE
+)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+_SENTENCE_HEADER_RE = re.compile(r'^[A-Z](?:\.\d+)*\s+')
+
+# Trigger phrases marking a sentence as a mandatory or informative requirement
+_MANDATORY_KEYWORDS = ["shall", "must", "required to", "responsible for", "directed to"]
+_INFORMATIVE_KEYWORDS = ["will", "plans to", "anticipated", "expected to"]
+_MANDATORY_RE = re.compile(
+    rf"\b(?:{'|'.join(map(re.escape, _MANDATORY_KEYWORDS))})\b", re.IGNORECASE
+)
+_INFORMATIVE_RE = re.compile(
+    rf"\b(?:{'|'.join(map(re.escape, _INFORMATIVE_KEYWORDS))})\b", re.IGNORECASE
+)
+# Either kind of trigger; sentences without one can never be requirements
+_ANY_TRIGGER_RE = re.compile(
+    rf"\b(?:{'|'.join(map(re.escape, _MANDATORY_KEYWORDS + _INFORMATIVE_KEYWORDS))})\b",
+    re.IGNORECASE
+)
+
+# Category keywords in priority order: the first category with a match wins
+_CATEGORY_KEYWORDS = {
+    'Technical': ['technical', 'system', 'software', 'hardware', 'network', 'infrastructure', 'security'],
+    'Process': ['process', 'procedure', 'workflow', 'method', 'approach', 'implementation'],
+    'Service': ['service', 'support', 'maintenance', 'operation', 'performance'],
+    'Documentation': ['document', 'report', 'plan', 'deliverable', 'submission'],
+    'Compliance': ['comply', 'compliance', 'requirement', 'standard', 'regulation', 'policy'],
+    'Training': ['training', 'instruction', 'education', 'knowledge', 'skill']
+}
+
+def _build_category_automaton():
+    """Build one Aho-Corasick automaton over every category keyword."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for rank, (category, keywords) in enumerate(_CATEGORY_KEYWORDS.items()):
+        for keyword in keywords:
+            automaton.add_word(keyword, (rank, category, len(keyword)))
+    automaton.make_automaton()
+    return automaton
+
+_CATEGORY_AUTOMATON = _build_category_automaton()
+
+_CATEGORY_RES = {
+    category: re.compile(rf"\b(?:{'|'.join(keywords)})\b", re.IGNORECASE)
+    for category, keywords in _CATEGORY_KEYWORDS.items()
+}
+
+def _is_word_char(char: str) -> bool:
+    """Match the regex notion of a word character, for \\b-style boundaries."""
+    return char.isalnum() or char == '_'
+
+# Classification depends only on the text, and SOWs repeat boilerplate
+# sentences, so results are memoized (bounded for long-running processes)
+@lru_cache(maxsize=4096)
+def _classify_sentence(sentence: str) -> Tuple[bool, Optional[str], float]:
+    """Classify a sentence as (is_requirement, type, confidence)."""
+    if len(sentence.split()) < 5:
+        return False, None, 0.0
+
+    is_mandatory = _MANDATORY_RE.search(sentence) is not None
+    is_informative = _INFORMATIVE_RE.search(sentence) is not None
+
+    if is_mandatory:
+        return True, "Mandatory", 0.8
+    if is_informative:
+        return True, "Informative", 0.6
+    return False, None, 0.0
+
+@lru_cache(maxsize=4096)
+def _categorize_text(text: str) -> str:
+    """Return the highest-priority category with a whole-word keyword in text."""
+    if _CATEGORY_AUTOMATON is None:
+        for category, pattern in _CATEGORY_RES.items():
+            if pattern.search(text):
+                return category
+        return 'General'
+
+    # One linear scan finds every keyword; keep the highest-priority
+    # category among whole-word hits
+    text = text.lower()
+    best = None
+    for end, (rank, category, length) in _CATEGORY_AUTOMATON.iter(text):
+        start = end - length + 1
+        if start > 0 and _is_word_char(text[start - 1]):
+            continue
+        if end + 1 < len(text) and _is_word_char(text[end + 1]):
+            continue
+        if best is None or rank < best[0]:
+            best = (rank, category)
+            if rank == 0:
+                break
+    return best[1] if best else 'General'
 
 class SOWProcessor:
     """Processes Statement of Work documents to extract requirements."""
 
+    # Parsed-section cache bounds; small texts are cheaper to re-parse than to hash and keep
+    SECTION_CACHE_SIZE = 32
+    SECTION_CACHE_MIN_CHARS = 1024
+
     def __init__(self):
         self.categories = {
-            'Technical': r'\b(?:technical|system|software|hardware|network|infrastructure|security)\b',
-            'Process': r'\b(?:process|procedure|workflow|method|approach|implementation)\b',
-            'Service': r'\b(?:service|support|maintenance|operation|performance)\b',
-            'Documentation': r'\b(?:document|report|plan|deliverable|submission)\b',
-            'Compliance': r'\b(?:comply|compliance|requirement|standard|regulation|policy)\b',
-            'Training': r'\b(?:training|instruction|education|knowledge|skill)\b'
+            category: rf"\b(?:{'|'.join(keywords)})\b"
+            for category, keywords in _CATEGORY_KEYWORDS.items()
         }
-        self.mandatory_keywords = ["shall", "must", "required to", "responsible for", "directed to"]
-        self.informative_keywords = ["will", "plans to", "anticipated", "expected to"]
+        self.mandatory_keywords = list(_MANDATORY_KEYWORDS)
+        self.informative_keywords = list(_INFORMATIVE_KEYWORDS)
+        self._section_cache: "OrderedDict[bytes, List[Dict]]" = OrderedDict()
 
     def process_document(self, file_path: str) -> List[Dict]:
         text = self._load_document(file_path)
@@ -55,24 +165,22 @@ class SOWProcessor:
             print(f"Error extracting text from page: {e}")
             return ""
 
+        # Buffered lines are collected in a list and joined once; growing a
+        # string with += is quadratic in the length of the buffered section
         lines = []
-        buffer = ""
+        buffer: List[str] = []
         for line in text.split('\n'):
             line = line.strip()
-            if not line or re.search(r'(?:Source|Page|For Official Use Only|^\d+$)', line):
+            if not line or _PAGE_NOISE_RE.search(line):
                 continue
-            if re.match(r'^[A-Z]\.(\d+)?', line) or buffer:
-                if buffer:
-                    buffer += " " + line
-                    if not line.endswith('.'):
-                        continue
-                else:
-                    buffer = line
+            # Cheap first-character check rejects prose lines before the regex
+            if (line[0].isupper() and _PAGE_SECTION_START_RE.match(line)) or buffer:
+                buffer.append(line)
             else:
-                lines.append(buffer)
-                buffer = line if line.endswith('.') else ""
+                lines.append(" ".join(buffer))
+                buffer = [line] if line.endswith('.') else []
         if buffer:
-            lines.append(buffer)
+            lines.append(" ".join(buffer))
         return '\n'.join(lines)
 
     def extract_requirements_from_text(self, text: str) -> List[Dict]:
@@ -88,39 +196,53 @@ class SOWProcessor:
         return self._sort_requirements(categorized_requirements)
 
     def _parse_sections(self, text: str) -> List[Dict]:
-        text = re.sub(r'(?m)^.*?(?:Source|Page|For Official Use Only).*$\n?', '', text)
-        text = re.sub(r'\.{3}.*?(?:\d+|$)', '', text)
-        text = re.sub(r'\(cid:\d*\)', '', text)
+        # Re-processed documents (re-uploads, re-indexing) reuse earlier parses
+        key = None
+        if len(text) >= self.SECTION_CACHE_MIN_CHARS:
+            key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+            cached = self._section_cache.get(key)
+            if cached is not None:
+                self._section_cache.move_to_end(key)
+                return [dict(section) for section in cached]
 
+        sections = self._scan_sections(text)
+
+        if key is not None:
+            self._section_cache[key] = [dict(section) for section in sections]
+            if len(self._section_cache) > self.SECTION_CACHE_SIZE:
+                self._section_cache.popitem(last=False)
+        return sections
+
+    def _scan_sections(self, text: str) -> List[Dict]:
+        text = _NOISE_RE.sub('', text)
+
+        # Find every header in one pass, then slice each body out from the
+        # end of its header to the start of the next one
         sections = []
-        section_patterns = [
-            r'(?:(?<=\n)|^)([A-Z]\.(\d+)?).*?(?=\n[A-Z]\.(\d+)?|$)',
-            r'(?:(?<=\n)|^)(\d+\.\d+\.\d+).*?(?=\n\d+\.\d+\.\d+|$)'
-        ]
-
-        for pattern in section_patterns:
-            matches = re.finditer(pattern, text, re.DOTALL)
-            for match in matches:
-                section_id = match.group(1).strip()
-                content = match.group(0)[len(section_id):].strip()
-                if content:
-                    sections.append({'id': section_id, 'content': self._clean_content(content)})
+        headers = list(_SECTION_HEADER_RE.finditer(text))
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            body_end = next_header.start() if next_header else len(text)
+            body = text[header.end():body_end].strip()
+            # A section needs some text after its ID: a title, a body, or both
+            content = '\n'.join(part for part in (header.group('title'), body) if part)
+            if content:
+                sections.append({'id': header.group('id'), 'content': self._clean_content(content)})
 
         return sections
 
     def _clean_content(self, content: str) -> str:
-        content = re.sub(r'\.{3}.*?(?:\d+|$)', '', content)
-        content = re.sub(r'\(cid:\d*\)', '', content)
-        content = re.sub(r'\s+', ' ', content)
-        return content.strip()
+        content = _INLINE_NOISE_RE.sub('', content)
+        return _WHITESPACE_RE.sub(' ', content).strip()
 
     def _extract_requirements(self, section: Dict) -> List[Dict]:
-        sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', section['content'])
+        sentences = _SENTENCE_SPLIT_RE.split(section['content'])
         requirements = []
 
         for sentence in sentences:
             sentence = sentence.strip()
-            if len(sentence.split()) < 3 or re.match(r'^[A-Z](?:\.\d+)*\s+', sentence):
+            if len(sentence.split()) < 3 or _SENTENCE_HEADER_RE.match(sentence):
+                continue
+            if not _ANY_TRIGGER_RE.search(sentence):
                 continue
 
             result = self._analyze_requirement(sentence)
@@ -135,25 +257,13 @@ class SOWProcessor:
         return requirements
 
     def _analyze_requirement(self, sentence: str) -> Dict:
-        doc = nlp(sentence)
-        if len(sentence.split()) < 5:
-            return {"is_requirement": False, "type": None, "confidence": 0.0}
-
-        is_mandatory = any(re.search(rf'\b{re.escape(kw)}\b', sentence.lower()) for kw in self.mandatory_keywords)
-        is_informative = any(re.search(rf'\b{re.escape(kw)}\b', sentence.lower()) for kw in self.informative_keywords)
-
-        confidence = 0.8 if is_mandatory else (0.6 if is_informative else 0.0)
-
-        return {
-            "is_requirement": is_mandatory or is_informative,
-            "type": "Mandatory" if is_mandatory else ("Informative" if is_informative else None),
-            "confidence": confidence
-        }
+        is_requirement, req_type, confidence = _classify_sentence(sentence)
+        return {"is_requirement": is_requirement, "type": req_type, "confidence": confidence}
 
     def _deduplicate_requirements(self, requirements: List[Dict]) -> List[Dict]:
         unique_requirements = {}
         for req in requirements:
-            normalized_text = re.sub(r'\s+', ' ', req['text'].lower().strip())
+            normalized_text = _WHITESPACE_RE.sub(' ', req['text'].lower().strip())
             if normalized_text not in unique_requirements or req['confidence'] > unique_requirements[normalized_text]['confidence']:
                 unique_requirements[normalized_text] = req
 
@@ -168,10 +278,7 @@ class SOWProcessor:
         return categorized_requirements
 
     def _categorize_requirement(self, text: str) -> str:
-        for category, pattern in self.categories.items():
-            if re.search(pattern, text, re.IGNORECASE):
-                return category
-        return 'General'
+        return _categorize_text(text)
 
     def _sort_requirements(self, requirements: List[Dict]) -> List[Dict]:
         def sort_key(req):
@@ -4,6 +4,7 @@ Enhanced relationship builder for Neo4j graph construction.
 
 import logging
 from typing import List, Dict, Any, Optional
+from itertools import islice
 import numpy as np
 from neo4j import GraphDatabase
 from neo4j.exceptions import Neo4jError
@@ -19,6 +20,7 @@ class RelationshipConfig:
     community_size_threshold: int = 100
     use_entity_relationships: bool = True
     use_community_detection: bool = True
+    write_batch_size: int = 10_000  # Relationships per UNWIND write transaction
 
 class EnhancedRelationshipBuilder:
     """Build enhanced relationships between chunks using multiple signals."""
@@ -48,54 +50,121 @@ class EnhancedRelationshipBuilder:
         with self.driver.session() as session:
             # Clear existing relationships
             logger.info("Clearing existing relationships...")
-            session.run("MATCH ()-[r]->() DELETE r")
+            session.execute_write(
+                lambda tx: tx.run("MATCH ()-[r]->() DELETE r").consume()
+            )
             
-            # Build different relationship types
+            # Build different relationship types in managed (retryable)
+            # write transactions
             self._build_similarity_relationships(session)
-            self._build_sequential_relationships(session)
+            session.execute_write(self._build_sequential_relationships)
             
             if self.config.use_entity_relationships:
-                self._build_entity_relationships(session)
+                session.execute_write(self._build_entity_relationships)
             
             if self.config.use_community_detection:
+                # GDS procedures manage their own transactions
                 self._detect_communities(session)
             
             # Get relationship statistics
-            stats = session.run("""
+            stats = session.execute_read(lambda tx: tx.run("""
                 MATCH ()-[r]->()
                 WITH type(r) as rel_type, count(*) as count
                 RETURN rel_type, count ORDER BY count DESC
-            """).data()
+            """).data())
             
             logger.info("Relationship counts:")
             for stat in stats:
                 logger.info(f"  {stat['rel_type']}: {stat['count']}")
                 
     def _build_similarity_relationships(self, session):
-        """Build relationships based on embedding similarity."""
+        """Build relationships based on embedding similarity.
+        
+        Edges are written with parameterized UNWIND batches, one managed
+        transaction per write_batch_size relationships.
+        """
         logger.info("Building similarity relationships...")
         
-        # Use vector index for efficient similarity search
-        result = session.run("""
-            CALL db.index.vector.queryNodes(
-                'chunk_embeddings',
-                $k,
-                $threshold
-            ) YIELD node, score
-            WITH node, score WHERE score >= $threshold
-            MERGE (node)-[:SIMILAR_TO {score: score}]->(other)
-        """, {
-            "k": self.config.max_relationships_per_node,
-            "threshold": self.config.similarity_threshold
-        })
+        # Fetch all chunk vectors into one contiguous (N, d) matrix
+        records = session.execute_read(lambda tx: tx.run("""
+            MATCH (c:Chunk)
+            WHERE c.vector IS NOT NULL
+            RETURN id(c) as id, c.vector as vector
+        """).data())
+        if len(records) < 2:
+            logger.info("Created 0 similarity relationships")
+            return
+            
+        ids = [record["id"] for record in records]
+        vectors = np.asarray([record["vector"] for record in records], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        
+        pairs = self._top_similar_pairs(vectors)
+        created = 0
+        while True:
+            edges = [
+                {"source": ids[i], "target": ids[j], "score": float(score)}
+                for i, j, score in islice(pairs, self.config.write_batch_size)
+            ]
+            if not edges:
+                break
+            created += session.execute_write(self._merge_similarity_batch, edges)
+        
+        logger.info(f"Created {created} similarity relationships")
+        
+    @staticmethod
+    def _merge_similarity_batch(tx, edges: List[Dict[str, Any]]) -> int:
+        """Merge one batch of SIMILAR_TO edges; returns the number created."""
+        result = tx.run("""
+            UNWIND $edges as edge
+            MATCH (node) WHERE id(node) = edge.source
+            MATCH (other) WHERE id(other) = edge.target
+            MERGE (node)-[:SIMILAR_TO {score: edge.score}]->(other)
+        """, {"edges": edges})
+        return result.consume().counters.relationships_created
+        
+    def _top_similar_pairs(self, vectors: np.ndarray, block_size: int = 1024):
+        """Find each row's most similar other rows above the threshold.
+        
+        Cosine similarities are computed one block of rows at a time with a
+        single matrix product, so memory stays at block_size x N.
+        
+        Args:
+            vectors: L2-normalized row vectors
+            block_size: Rows scored per matrix product
+            
+        Yields:
+            (row, other_row, score) for up to max_relationships_per_node
+            neighbours per row with score >= similarity_threshold
+        """
+        count = len(vectors)
+        k = min(self.config.max_relationships_per_node, count - 1)
         
-        logger.info(f"Created {result.consume().counters.relationships_created} similarity relationships")
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            similarities = vectors[start:stop] @ vectors.T
+            
+            # A chunk is never its own neighbour
+            rows = np.arange(stop - start)
+            similarities[rows, rows + start] = -np.inf
+            
+            # Keep only the k best candidates per row
+            if k < count - 1:
+                candidates = np.argpartition(-similarities, k, axis=1)[:, :k]
+            else:
+                candidates = np.argsort(-similarities, axis=1)[:, :k]
+            scores = np.take_along_axis(similarities, candidates, axis=1)
+            
+            for row, col in zip(*np.nonzero(scores >= self.config.similarity_threshold)):
+                yield start + row, candidates[row, col], scores[row, col]
         
-    def _build_sequential_relationships(self, session):
+    def _build_sequential_relationships(self, tx):
         """Build sequential relationships within documents."""
         logger.info("Building sequential relationships...")
         
-        result = session.run("""
+        result = tx.run("""
             MATCH (c1:Chunk)
             WHERE c1.source IS NOT NULL
             WITH c1.source as source, collect(c1) as chunks
@@ -107,12 +176,12 @@ class EnhancedRelationshipBuilder:
         
         logger.info(f"Created {result.consume().counters.relationships_created} sequential relationships")
         
-    def _build_entity_relationships(self, session):
+    def _build_entity_relationships(self, tx):
         """Build relationships through shared entities."""
         logger.info("Building entity-based relationships...")
         
         # Connect chunks that mention same entities
-        result = session.run("""
+        result = tx.run("""
             MATCH (c1:Chunk)-[:MENTIONS]->(e:Entity)<-[:MENTIONS]-(c2:Chunk)
             WHERE id(c1) < id(c2)
             WITH c1, c2, count(e) as shared_entities
@@ -123,7 +192,7 @@ class EnhancedRelationshipBuilder:
         logger.info(f"Created {result.consume().counters.relationships_created} entity relationships")
         
         # Create entity-entity relationships
-        result = session.run("""
+        result = tx.run("""
             MATCH (e1:Entity)<-[:MENTIONS]-(c:Chunk)-[:MENTIONS]->(e2:Entity)
             WHERE id(e1) < id(e2)
             WITH e1, e2, count(c) as cooccurrences
@@ -138,6 +207,15 @@ class EnhancedRelationshipBuilder:
         logger.info("Detecting communities...")
         
         try:
+            # A projection left behind by an interrupted run would make
+            # gds.graph.project fail, so drop it before re-projecting
+            exists = session.run("""
+                CALL gds.graph.exists('chunk_graph') YIELD exists
+                RETURN exists
+            """).single()["exists"]
+            if exists:
+                session.run("CALL gds.graph.drop('chunk_graph')")
+                
             # Project graph for community detection
             session.run("""
                 CALL gds.graph.project(
@@ -158,25 +236,26 @@ class EnhancedRelationshipBuilder:
                 )
             """)
             
-            # Run Louvain community detection
-            result = session.run("""
-                CALL gds.louvain.write('chunk_graph', {
-                    writeProperty: 'community',
-                    relationshipWeightProperty: 'score',
-                    maxLevels: 10,
-                    maxIterations: 10
-                })
-                YIELD communityCount, modularity
-                RETURN communityCount, modularity
-            """).single()
-            
-            logger.info(
-                f"Detected {result['communityCount']} communities "
-                f"with modularity {result['modularity']:.3f}"
-            )
-            
-            # Clean up projected graph
-            session.run("CALL gds.graph.drop('chunk_graph')")
+            try:
+                # Run Louvain community detection
+                result = session.run("""
+                    CALL gds.louvain.write('chunk_graph', {
+                        writeProperty: 'community',
+                        relationshipWeightProperty: 'score',
+                        maxLevels: 10,
+                        maxIterations: 10
+                    })
+                    YIELD communityCount, modularity
+                    RETURN communityCount, modularity
+                """).single()
+                
+                logger.info(
+                    f"Detected {result['communityCount']} communities "
+                    f"with modularity {result['modularity']:.3f}"
+                )
+            finally:
+                # Clean up projected graph
+                session.run("CALL gds.graph.drop('chunk_graph', false)")
             
         except Neo4jError as e:
             logger.error(f"Error in community detection: {str(e)}")
@@ -189,17 +268,22 @@ class EnhancedRelationshipBuilder:
         """
         with self.driver.session() as session:
             # Basic statistics
-            basic_stats = session.run("""
-                MATCH (c:Chunk)
-                OPTIONAL MATCH (c)-[r]->()
-                WITH count(DISTINCT c) as nodes,
-                     count(DISTINCT r) as relationships,
-                     avg(size((c)-->()))as avg_degree
-                RETURN nodes, relationships, avg_degree
-            """).single()
+            basic_stats = session.execute_read(lambda tx: tx.run("""
+                CALL {
+                    MATCH (c:Chunk)
+                    RETURN count(c) as nodes
+                }
+                CALL {
+                    MATCH (:Chunk)-[r]->()
+                    RETURN count(r) as relationships
+                }
+                RETURN nodes, relationships,
+                       CASE WHEN nodes = 0 THEN 0.0
+                            ELSE toFloat(relationships) / nodes END as avg_degree
+            """).single())
             
             # Community statistics
-            community_stats = session.run("""
+            community_stats = session.execute_read(lambda tx: tx.run("""
                 MATCH (c:Chunk)
                 WHERE c.community IS NOT NULL
                 WITH c.community as community, count(*) as size
@@ -208,10 +292,10 @@ class EnhancedRelationshipBuilder:
                     community: community,
                     size: size
                 }) as communities
-            """).single()["communities"]
+            """).single())["communities"]
             
             # Entity statistics
-            entity_stats = session.run("""
+            entity_stats = session.execute_read(lambda tx: tx.run("""
                 MATCH (e:Entity)
                 OPTIONAL MATCH (e)<-[:MENTIONS]-(c:Chunk)
                 WITH e.label as label,
@@ -223,7 +307,7 @@ class EnhancedRelationshipBuilder:
                     count: count,
                     avg_mentions: avg_mentions
                 }) as entities
-            """).single()["entities"]
+            """).single())["entities"]
             
             return {
                 "basic_stats": {
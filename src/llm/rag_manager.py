@@ -3,11 +3,13 @@ RAG manager for integrating Claude LLM capabilities with the knowledge base.
 """
 
 import logging
-import json
+import time
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 import anthropic
+import orjson
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -15,8 +17,36 @@ from tenacity import (
     retry_if_exception_type
 )
 
+try:
+    import tiktoken
+except ImportError:  # Fall back to whitespace word counts
+    tiktoken = None
+
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the BPE encoding used for token counts, or None without tiktoken."""
+    if tiktoken is None:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+def _count_tokens(text: str) -> int:
+    """Count BPE tokens in text, or whitespace words without tiktoken."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text.split())
+    return len(encoding.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=4096)
+def _count_chunk_tokens(text: str) -> int:
+    """Count tokens in a context chunk, memoized so repeated chunks are encoded once.
+    
+    Prompts and completions are unique per call and go through _count_tokens
+    directly instead of filling this cache.
+    """
+    return _count_tokens(text)
+
 @dataclass
 class RAGConfig:
     """Configuration for RAG operations."""
@@ -38,7 +68,7 @@ class RAGResponse:
     prompt_tokens: int
     completion_tokens: int
     total_tokens: int
-    timestamp: datetime
+    timestamp: int  # Nanoseconds since the epoch (UTC)
 
 class RAGManager:
     """Manages RAG operations with Claude integration."""
@@ -63,34 +93,55 @@ class RAGManager:
         wait=wait_exponential(multiplier=1, min=4, max=10),
         retry=retry_if_exception_type(anthropic.RateLimitError)
     )
+    def _complete(self, prompt: str):
+        """Request a completion, retrying on rate limits.
+        
+        Only the API call is retried; the prompt is built once by the caller.
+        """
+        return self.client.completion(
+            prompt=prompt,
+            model=self.config.model_name,
+            max_tokens_to_sample=self.config.max_tokens,
+            temperature=self.config.temperature,
+            stop_sequences=[anthropic.HUMAN_PROMPT]
+        )
+        
     def generate_response(self,
                          query: str,
-                         system_prompt: Optional[str] = None) -> RAGResponse:
+                         system_prompt: Optional[str] = None,
+                         explain: bool = False) -> RAGResponse:
         """Generate response using RAG with Claude.
         
         Args:
             query: User query
             system_prompt: Optional system prompt
+            explain: Whether to request a search explanation (debug/trace only)
             
         Returns:
             RAG response with answer and metadata
         """
-        # Get relevant context
+        # Get relevant context; the explanation is only needed for tracing
         search_results = self.search_engine.search(
             query,
-            explain=True
+            explain=explain
         )
         
-        # Prepare context
+        # Prepare context; the question shares the token budget
         context_chunks = []
         citations = []
-        total_length = 0
+        total_length = _count_tokens(query)
         
         for result in search_results["results"][:self.config.top_k_results]:
             # Skip if below similarity threshold
             if result["vector_score"] < self.config.similarity_threshold:
                 continue
                 
+            # Stop before a chunk would push the context over the limit
+            chunk_tokens = _count_chunk_tokens(result["text"])
+            if total_length + chunk_tokens > self.config.context_limit:
+                break
+            total_length += chunk_tokens
+                
             # Add context and citation
             chunk = {
                 "text": result["text"],
@@ -106,11 +157,6 @@ class RAGManager:
                     "score": result["final_score"]
                 })
                 
-            # Check context length
-            total_length += len(result["text"].split())
-            if total_length >= self.config.context_limit:
-                break
-                
         # Construct prompt
         system_message = system_prompt or (
             "You are a helpful AI assistant. Answer questions based on "
@@ -127,33 +173,31 @@ class RAGManager:
         prompt = f"{anthropic.HUMAN_PROMPT} {context_message}\nQuestion: {query}{anthropic.AI_PROMPT}"
         
         # Generate response
-        completion = self.client.completion(
-            prompt=prompt,
-            model=self.config.model_name,
-            max_tokens_to_sample=self.config.max_tokens,
-            temperature=self.config.temperature,
-            stop_sequences=[anthropic.HUMAN_PROMPT]
-        )
+        completion = self._complete(prompt)
         
         # Extract token counts
-        prompt_tokens = len(prompt.split())  # Approximate
-        completion_tokens = len(completion.completion.split())
+        prompt_tokens = _count_tokens(prompt)  # Approximate for Claude models
+        completion_tokens = _count_tokens(completion.completion)
         total_tokens = prompt_tokens + completion_tokens
         
+        metadata = {
+            "model": self.config.model_name,
+            "temperature": self.config.temperature,
+            "max_tokens": self.config.max_tokens,
+            "system_prompt": system_message
+        }
+        if explain and "explanation" in search_results:
+            metadata["search_explanation"] = search_results["explanation"]
+        
         return RAGResponse(
             answer=completion.completion,
             citations=citations,
             context_used=context_chunks,
-            metadata={
-                "model": self.config.model_name,
-                "temperature": self.config.temperature,
-                "max_tokens": self.config.max_tokens,
-                "system_prompt": system_message
-            },
+            metadata=metadata,
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=total_tokens,
-            timestamp=datetime.utcnow()
+            timestamp=time.time_ns()
         )
         
     def format_response(self, response: RAGResponse) -> Dict[str, Any]:
@@ -171,7 +215,7 @@ class RAGManager:
                 {
                     "text": c["text"],
                     "source": c["source"],
-                    "relevance_score": f"{c['score']:.2f}"
+                    "relevance_score": round(float(c["score"]), 2)
                 }
                 for c in response.citations
             ],
@@ -182,7 +226,10 @@ class RAGManager:
                     "completion": response.completion_tokens,
                     "total": response.total_tokens
                 },
-                "timestamp": response.timestamp.isoformat()
+                "timestamp": datetime.fromtimestamp(
+                    response.timestamp / 1e9,
+                    tz=timezone.utc
+                ).isoformat()
             }
         }
 
@@ -217,7 +264,7 @@ def main():
         formatted = manager.format_response(response)
         print("\nQuery:", query)
         print("\nResponse:")
-        print(json.dumps(formatted, indent=2))
+        print(orjson.dumps(formatted, option=orjson.OPT_INDENT_2).decode())
         
     finally:
         system.close()
@@ -4,10 +4,12 @@ Main entry point for the enhanced RAG system.
 
 import logging
 import argparse
-import json
-from typing import List, Dict, Any, Optional
+import orjson
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Iterable, List, Dict, Any, Optional
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 from src.embeddings.embedding_generator import EmbeddingGenerator
 from src.entity_processing.entity_extractor import EntityExtractor
@@ -23,6 +25,23 @@ from src.monitoring.system_monitor import SystemMonitor
 
 logger = logging.getLogger(__name__)
 
+_ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
+@lru_cache(maxsize=1)
+def _load_embedding_model(model_name: str, cache_dir: Optional[str]) -> EmbeddingGenerator:
+    """Load an embedding model once and share it.
+    
+    Only the most recent configuration is kept, so switching models (or
+    cache directories) releases the previous one instead of pinning every
+    model ever loaded in memory.
+    """
+    return EmbeddingGenerator(model_name=model_name, cache_dir=cache_dir)
+
+@lru_cache(maxsize=1)
+def _load_entity_extractor(model: str) -> EntityExtractor:
+    """Load an entity extraction pipeline once and share the latest one."""
+    return EntityExtractor(model=model)
+
 @dataclass
 class SystemConfig:
     """Configuration for the RAG system."""
@@ -32,7 +51,10 @@ class SystemConfig:
     embedding_model: str = "sentence-transformers/all-mpnet-base-v2"
     entity_model: str = "en_core_web_sm"
     prometheus_port: int = 8000
+    start_metrics_server: bool = True  # Serve metrics on prometheus_port (needs enable_metrics)
     cache_dir: Optional[str] = None
+    enable_metrics: bool = True  # False also keeps the metrics server off
+    warmup: bool = True
 
 class RAGSystem:
     """Enhanced RAG system with entity awareness and monitoring."""
@@ -48,14 +70,13 @@ class RAGSystem:
         # Initialize components
         logger.info("Initializing system components...")
         
-        self.embedding_model = EmbeddingGenerator(
-            model_name=config.embedding_model,
-            cache_dir=config.cache_dir
+        # Models are shared by every RAGSystem in the process
+        self.embedding_model = _load_embedding_model(
+            config.embedding_model,
+            config.cache_dir
         )
         
-        self.entity_extractor = EntityExtractor(
-            model=config.entity_model
-        )
+        self.entity_extractor = _load_entity_extractor(config.entity_model)
         
         self.relationship_builder = EnhancedRelationshipBuilder(
             uri=config.neo4j_uri,
@@ -80,37 +101,98 @@ class RAGSystem:
             )
         )
         
-        self.monitor = SystemMonitor(
-            neo4j_uri=config.neo4j_uri,
-            neo4j_user=config.neo4j_user,
-            neo4j_password=config.neo4j_password,
-            prometheus_port=config.prometheus_port
-        )
+        # Monitor (and its Prometheus exporter) is started on first use
+        self._monitor = None
+        
+        if config.warmup:
+            self._warmup()
         
         logger.info("System initialization complete")
         
+    def _warmup(self):
+        """Run a dummy encode so the first real query is fast.
+        
+        Only the encoder is warmed: the search index is always empty at
+        startup, and a dummy search would just cache an empty result.
+        """
+        try:
+            self.embedding_model.encode(["warmup"])
+        except Exception as e:
+            logger.warning(f"Warmup failed: {str(e)}")
+        
+    @property
+    def monitor(self) -> SystemMonitor:
+        """System monitor, created lazily to keep cold starts cheap.
+        
+        The monitor can still be created with enable_metrics off (e.g. for
+        get_system_status), but the Prometheus exporter is only started
+        when both enable_metrics and start_metrics_server are set.
+        """
+        if self._monitor is None:
+            self._monitor = SystemMonitor(
+                neo4j_uri=self.config.neo4j_uri,
+                neo4j_user=self.config.neo4j_user,
+                neo4j_password=self.config.neo4j_password,
+                prometheus_port=self.config.prometheus_port,
+                start_metrics_server=(
+                    self.config.enable_metrics and self.config.start_metrics_server
+                )
+            )
+        return self._monitor
+        
+    def _track_operation(self, operation_type: str):
+        """Track an operation unless metrics are disabled."""
+        if not self.config.enable_metrics:
+            return nullcontext()
+        return self.monitor.track_operation(operation_type)
+        
     def close(self):
         """Close all connections."""
         self.relationship_builder.close()
         self.search_engine.close()
-        self.monitor.close()
+        if self._monitor is not None:
+            self._monitor.close()
+        
+    @staticmethod
+    def _validate_documents(documents: Iterable[Dict[str, str]],
+                            field: str) -> List[Dict[str, str]]:
+        """Check every document up front, before anything is written.
         
+        Returns:
+            The documents as a list
+            
+        Raises:
+            ValueError: If a document is missing the given field
+        """
+        documents = documents if isinstance(documents, list) else list(documents)
+        for i, doc in enumerate(documents):
+            if not isinstance(doc, dict) or field not in doc:
+                raise ValueError(f"Document {i} has no '{field}' field")
+        return documents
+            
     def process_documents(self,
-                         documents: List[Dict[str, str]],
+                         documents: Iterable[Dict[str, str]],
                          source: str,
                          doc_type: str = "general") -> List[Dict[str, Any]]:
         """Process documents and add to knowledge base.
         
         Args:
-            documents: List of documents with text content
+            documents: Documents with text content; any iterable, read in
+                full and validated before processing starts
             source: Source identifier
             doc_type: Document type ("general" or "sow")
             
         Returns:
             List of processed chunks with metadata
         """
-        with self.monitor.track_operation("process_documents"):
-            logger.info(f"Processing {len(documents)} {doc_type} documents from {source}")
+        with self._track_operation("process_documents"):
+            logger.info(f"Processing {doc_type} documents from {source}")
+            
+            # Reject malformed input before any model work or graph writes
+            documents = self._validate_documents(
+                documents,
+                "content" if doc_type == "sow" else "text"
+            )
             
             if doc_type == "sow":
                 # Process SOW documents
@@ -176,18 +258,18 @@ class RAGSystem:
         Returns:
             Search results with optional explanation
         """
-        with self.monitor.track_operation("search"):
+        with self._track_operation("search"):
             results = self.search_engine.search(query)
             
             if explain:
                 explanation = self.search_engine.explain_results(results)
                 return {
-                    "results": [vars(r) for r in results],
+                    "results": [asdict(r) for r in results],
                     "explanation": explanation
                 }
             else:
                 return {
-                    "results": [vars(r) for r in results]
+                    "results": [asdict(r) for r in results]
                 }
                 
     def get_system_status(self) -> Dict[str, Any]:
@@ -248,15 +330,22 @@ def main():
         action='store_true',
         help='Explain search results'
     )
+    parser.add_argument(
+        '--no-metrics',
+        action='store_true',
+        help='Disable performance monitoring and the Prometheus exporter'
+    )
     args = parser.parse_args()
     
     # Load config
     if args.config:
-        with open(args.config) as f:
-            config_dict = json.load(f)
+        with open(args.config, "rb") as f:
+            config_dict = orjson.loads(f.read())
         config = SystemConfig(**config_dict)
     else:
         config = SystemConfig()
+    if args.no_metrics:
+        config.enable_metrics = False
     
     # Initialize system
     system = RAGSystem(config)
@@ -266,12 +355,12 @@ def main():
             # Perform search
             results = system.search(args.query, explain=args.explain)
             print("\nSearch Results:")
-            print(json.dumps(results, indent=2))
+            print(orjson.dumps(results, option=_ORJSON_OPTIONS).decode())
         else:
             # Show system status
             status = system.get_system_status()
             print("\nSystem Status:")
-            print(json.dumps(status, indent=2))
+            print(orjson.dumps(status, option=_ORJSON_OPTIONS).decode())
             
     finally:
         system.close()
@@ -3,11 +3,14 @@ System monitoring and diagnostics for the RAG pipeline.
 """
 
 import logging
+import threading
 import time
-from typing import Dict, Any, List, Optional
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Deque
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-import json
+import orjson
 import psutil
 import numpy as np
 from neo4j import GraphDatabase
@@ -53,6 +56,35 @@ GRAPH_SIZE = Gauge(
     ['metric_type']
 )
 
+# Known label values; anything else is folded into "other" to keep
+# Prometheus series cardinality bounded
+_ALLOWED_OPERATIONS = frozenset({
+    "process_documents",
+    "search",
+    "get_status",
+    "embed",
+    "graph_query"
+})
+_ALLOWED_ERRORS = frozenset({
+    "Neo4jError",
+    "ServiceUnavailable",
+    "TimeoutError",
+    "ValueError",
+    "KeyError",
+    "RateLimitError"
+})
+
+# Label-bound children resolved once, so tracking an operation skips the
+# per-call label lookup inside prometheus_client
+_LATENCY_BY_OPERATION = {
+    op: SEARCH_LATENCY.labels(operation_type=op)
+    for op in _ALLOWED_OPERATIONS | {"other"}
+}
+_ERRORS_BY_TYPE = {
+    error_type: SEARCH_ERRORS.labels(error_type=error_type)
+    for error_type in _ALLOWED_ERRORS | {"other"}
+}
+
 @dataclass
 class PerformanceMetrics:
     """Performance metrics for monitoring."""
@@ -63,6 +95,93 @@ class PerformanceMetrics:
     error_count: int
     timestamp: datetime
 
+_EPOCH = datetime(1970, 1, 1)
+
+def _to_ns(timestamp: datetime) -> int:
+    """Convert a naive UTC datetime to nanoseconds since the epoch."""
+    return (timestamp - _EPOCH) // timedelta(microseconds=1) * 1000
+
+def _from_ns(timestamp_ns: int) -> datetime:
+    """Convert nanoseconds since the epoch to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=int(timestamp_ns) // 1000)
+
+class PerformanceHistory:
+    """Fixed-size ring buffer of performance metrics stored column-wise."""
+    
+    COLUMNS = ("latency_ms", "memory_mb", "cpu_percent",
+               "cache_hit_rate", "error_count")
+    
+    def __init__(self, maxlen: int):
+        """Preallocate one array per metric plus a timestamp column.
+        
+        Args:
+            maxlen: Number of entries retained before the oldest is overwritten
+        """
+        self.maxlen = maxlen
+        self.latency_ms = np.zeros(maxlen, dtype=np.float64)
+        self.memory_mb = np.zeros(maxlen, dtype=np.float64)
+        self.cpu_percent = np.zeros(maxlen, dtype=np.float64)
+        self.cache_hit_rate = np.zeros(maxlen, dtype=np.float64)
+        self.error_count = np.zeros(maxlen, dtype=np.int64)
+        self.timestamp_ns = np.zeros(maxlen, dtype=np.int64)
+        self._cursor = 0  # Total number of entries ever appended
+        
+    def __len__(self) -> int:
+        return min(self._cursor, self.maxlen)
+        
+    def __getitem__(self, index: int) -> PerformanceMetrics:
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("performance history index out of range")
+            
+        slot = (self._cursor - size + index) % self.maxlen
+        return PerformanceMetrics(
+            latency_ms=float(self.latency_ms[slot]),
+            memory_mb=float(self.memory_mb[slot]),
+            cpu_percent=float(self.cpu_percent[slot]),
+            cache_hit_rate=float(self.cache_hit_rate[slot]),
+            error_count=int(self.error_count[slot]),
+            timestamp=_from_ns(self.timestamp_ns[slot])
+        )
+        
+    def append(self, metrics: PerformanceMetrics):
+        """Write metrics into the next slot, overwriting the oldest if full."""
+        slot = self._cursor % self.maxlen
+        self.latency_ms[slot] = metrics.latency_ms
+        self.memory_mb[slot] = metrics.memory_mb
+        self.cpu_percent[slot] = metrics.cpu_percent
+        self.cache_hit_rate[slot] = metrics.cache_hit_rate
+        self.error_count[slot] = metrics.error_count
+        self.timestamp_ns[slot] = _to_ns(metrics.timestamp)
+        self._cursor += 1
+        
+    def extend(self, metrics: List[PerformanceMetrics]):
+        """Append several metrics in order."""
+        for m in metrics:
+            self.append(m)
+            
+    def since(self, cutoff: datetime) -> Dict[str, np.ndarray]:
+        """Get metric columns for entries recorded at or after cutoff.
+        
+        Args:
+            cutoff: Earliest timestamp to include
+            
+        Returns:
+            Mapping of column name to array, oldest entry first
+        """
+        size = len(self)
+        slots = np.arange(self._cursor - size, self._cursor) % self.maxlen
+        start = np.searchsorted(
+            self.timestamp_ns[slots], _to_ns(cutoff), side="left"
+        )
+        slots = slots[start:]
+        return {
+            name: getattr(self, name)[slots]
+            for name in self.COLUMNS
+        }
+
 @dataclass
 class GraphMetrics:
     """Neo4j graph metrics."""
@@ -79,7 +198,11 @@ class SystemMonitor:
                  neo4j_uri: str = "bolt://localhost:7687",
                  neo4j_user: str = "neo4j",
                  neo4j_password: str = "password",
-                 prometheus_port: int = 8000):
+                 prometheus_port: int = 8000,
+                 start_metrics_server: bool = True,
+                 max_history: int = 100_000,
+                 graph_metrics_ttl: float = 60.0,
+                 resource_sample_interval: float = 1.0):
         """Initialize the system monitor.
         
         Args:
@@ -87,6 +210,11 @@ class SystemMonitor:
             neo4j_user: Neo4j username
             neo4j_password: Neo4j password
             prometheus_port: Port for Prometheus metrics
+            start_metrics_server: Whether to serve metrics over HTTP; when
+                False they are still recorded in the default registry
+            max_history: Maximum number of metrics/errors to retain
+            graph_metrics_ttl: Seconds to reuse collected graph metrics
+            resource_sample_interval: Seconds between memory/CPU samples
         """
         self.driver = GraphDatabase.driver(
             neo4j_uri,
@@ -94,55 +222,89 @@ class SystemMonitor:
         )
         
         # Start Prometheus metrics server
-        start_http_server(prometheus_port)
-        logger.info(f"Started Prometheus metrics server on port {prometheus_port}")
+        if start_metrics_server:
+            start_http_server(prometheus_port)
+            logger.info(f"Started Prometheus metrics server on port {prometheus_port}")
         
-        # Initialize performance tracking
-        self.performance_history: List[PerformanceMetrics] = []
-        self.error_history: List[Dict[str, Any]] = []
+        # Initialize performance tracking (bounded ring buffers, oldest first)
+        self.performance_history = PerformanceHistory(max_history)
+        self.error_history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+        self._process = psutil.Process()
         self.last_graph_metrics: Optional[GraphMetrics] = None
+        self._graph_metrics_ttl = graph_metrics_ttl
+        self._graph_metrics_ts = 0.0
+        
+        # Memory/CPU change slowly, so sample them in the background rather
+        # than hitting /proc on every tracked operation
+        self._memory_mb = 0.0
+        self._cpu_percent = 0.0
+        self._sample_resources()
+        self._sampler_stop = threading.Event()
+        self._sampler = threading.Thread(
+            target=self._run_resource_sampler,
+            args=(resource_sample_interval,),
+            name="system-monitor-sampler",
+            daemon=True
+        )
+        self._sampler.start()
         
     def close(self):
-        """Close Neo4j connection."""
+        """Stop background sampling and close Neo4j connection."""
+        self._sampler_stop.set()
+        self._sampler.join()
         self.driver.close()
         
+    def _sample_resources(self):
+        """Read process memory and CPU usage into the cached values."""
+        with self._process.oneshot():
+            self._memory_mb = self._process.memory_info().rss / (1024 * 1024)
+            self._cpu_percent = self._process.cpu_percent()
+            
+        MEMORY_USAGE.labels(
+            component='python_process'
+        ).set(self._memory_mb * 1024 * 1024)  # Convert to bytes
+        
+    def _run_resource_sampler(self, interval: float):
+        """Refresh cached resource usage until the monitor is closed."""
+        while not self._sampler_stop.wait(interval):
+            try:
+                self._sample_resources()
+            except psutil.Error as e:
+                logger.warning(f"Failed to sample process resources: {str(e)}")
+        
+    @contextmanager
     def track_operation(self, operation_type: str):
         """Context manager to track operation performance.
         
         Args:
             operation_type: Type of operation being tracked
         """
-        class OperationTracker:
-            def __init__(self, monitor):
-                self.monitor = monitor
-                self.operation_type = operation_type
-                self.start_time = None
-                
-            def __enter__(self):
-                self.start_time = time.time()
-                return self
-                
-            def __exit__(self, exc_type, exc_val, exc_tb):
-                duration = time.time() - self.start_time
-                
-                # Record Prometheus metrics
-                SEARCH_LATENCY.labels(
-                    operation_type=self.operation_type
-                ).observe(duration)
-                
-                if exc_type is not None:
-                    SEARCH_ERRORS.labels(
-                        error_type=exc_type.__name__
-                    ).inc()
-                    
-                # Record detailed metrics
-                self.monitor.record_performance_metrics(
-                    latency_ms=duration * 1000,
-                    operation_type=self.operation_type,
-                    error=exc_val
-                )
+        start_time = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            duration = time.perf_counter() - start_time
+            
+            # Record Prometheus metrics
+            _LATENCY_BY_OPERATION.get(
+                operation_type, _LATENCY_BY_OPERATION["other"]
+            ).observe(duration)
+            
+            if error is not None:
+                _ERRORS_BY_TYPE.get(
+                    type(error).__name__, _ERRORS_BY_TYPE["other"]
+                ).inc()
                 
-        return OperationTracker(self)
+            # Record detailed metrics
+            self.record_performance_metrics(
+                latency_ms=duration * 1000,
+                operation_type=operation_type,
+                error=error
+            )
         
     def record_performance_metrics(self,
                                  latency_ms: float,
@@ -155,16 +317,11 @@ class SystemMonitor:
             operation_type: Type of operation
             error: Exception if operation failed
         """
-        # Get system metrics
-        process = psutil.Process()
-        memory_mb = process.memory_info().rss / (1024 * 1024)
-        cpu_percent = process.cpu_percent()
-        
-        # Record metrics
+        # Record metrics using the most recent background resource sample
         metrics = PerformanceMetrics(
             latency_ms=latency_ms,
-            memory_mb=memory_mb,
-            cpu_percent=cpu_percent,
+            memory_mb=self._memory_mb,
+            cpu_percent=self._cpu_percent,
             cache_hit_rate=0.0,  # Updated by cache monitoring
             error_count=1 if error else 0,
             timestamp=datetime.utcnow()
@@ -172,15 +329,10 @@ class SystemMonitor:
         
         self.performance_history.append(metrics)
         
-        # Update Prometheus metrics
-        MEMORY_USAGE.labels(
-            component='python_process'
-        ).set(memory_mb * 1024 * 1024)  # Convert to bytes
-        
         # Record error if any
         if error:
             self.error_history.append({
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": time.time_ns(),
                 "operation": operation_type,
                 "error_type": type(error).__name__,
                 "error_message": str(error),
@@ -193,39 +345,49 @@ class SystemMonitor:
         Returns:
             Graph metrics
         """
-        with self.driver.session() as session:
-            # Basic graph metrics
-            basic_metrics = session.run("""
-                MATCH (n)
-                OPTIONAL MATCH (n)-[r]->()
-                WITH count(DISTINCT n) as nodes,
-                     count(DISTINCT r) as rels,
-                     avg(size((n)-->()))as avg_degree
-                RETURN nodes, rels, avg_degree
-            """).single()
+        if (self.last_graph_metrics is not None and
+                time.monotonic() - self._graph_metrics_ts < self._graph_metrics_ttl):
+            return self.last_graph_metrics
             
-            # Index sizes
-            index_sizes = session.run("""
-                CALL db.indexes() YIELD name, type, labelsOrTypes, properties,
-                                       state, populationPercent
-                RETURN collect({
-                    name: name,
-                    type: type,
-                    state: state,
-                    progress: populationPercent
-                }) as indexes
-            """).single()["indexes"]
+        # Single round-trip: each aggregate runs as a subquery, and the
+        # node/relationship counts are answered from the count store
+        with self.driver.session() as session:
+            record = session.execute_read(
+                lambda tx: tx.run("""
+                    CALL {
+                        MATCH (n)
+                        RETURN count(n) as nodes
+                    }
+                    CALL {
+                        MATCH ()-[r]->()
+                        RETURN count(r) as rels
+                    }
+                    CALL {
+                        CALL db.indexes() YIELD name, type, labelsOrTypes,
+                                               properties, state,
+                                               populationPercent
+                        RETURN collect({
+                            name: name,
+                            type: type,
+                            state: state,
+                            progress: populationPercent
+                        }) as indexes
+                    }
+                    CALL {
+                        MATCH (n:Chunk)
+                        WHERE n.community IS NOT NULL
+                        WITH n.community as community, count(*) as size
+                        RETURN collect(toString(community)) as community_ids,
+                               collect(size) as community_sizes
+                    }
+                    RETURN nodes, rels,
+                           CASE WHEN nodes = 0 THEN 0.0
+                                ELSE toFloat(rels) / nodes END as avg_degree,
+                           indexes, community_ids, community_sizes
+                """).single()
+            )
             
-            # Community statistics
-            community_stats = session.run("""
-                MATCH (n:Chunk)
-                WHERE n.community IS NOT NULL
-                WITH n.community as community, count(*) as size
-                RETURN collect({
-                    community: community,
-                    size: size
-                }) as communities
-            """).single()["communities"]
+            index_sizes = record["indexes"]
             
             # Calculate total index size (estimated)
             total_index_size_mb = sum(
@@ -234,14 +396,13 @@ class SystemMonitor:
             )
             
             metrics = GraphMetrics(
-                node_count=basic_metrics["nodes"],
-                relationship_count=basic_metrics["rels"],
+                node_count=record["nodes"],
+                relationship_count=record["rels"],
                 index_size_mb=total_index_size_mb,
-                avg_degree=basic_metrics["avg_degree"],
-                community_stats={
-                    str(c["community"]): c["size"]
-                    for c in community_stats
-                }
+                avg_degree=record["avg_degree"],
+                community_stats=dict(
+                    zip(record["community_ids"], record["community_sizes"])
+                )
             )
             
             # Update Prometheus metrics
@@ -254,6 +415,7 @@ class SystemMonitor:
             )
             
             self.last_graph_metrics = metrics
+            self._graph_metrics_ts = time.monotonic()
             return metrics
             
     def _estimate_index_size(self, index_info: Dict[str, Any]) -> float:
@@ -284,50 +446,43 @@ class SystemMonitor:
             Performance summary
         """
         cutoff = datetime.utcnow() - timedelta(hours=hours)
-        recent_metrics = [
-            m for m in self.performance_history
-            if m.timestamp >= cutoff
-        ]
+        recent = self.performance_history.since(cutoff)
+        latency = recent["latency_ms"]
         
-        if not recent_metrics:
+        if not latency.size:
             return {
                 "message": "No metrics available for specified period"
             }
             
+        # Order statistics via an O(n) partition instead of a full sort
+        n = latency.size
+        k95 = min(int(n * 0.95), n - 1)
+        k99 = min(int(n * 0.99), n - 1)
+        partitioned = np.partition(latency, [k95, k99])
+        p95, p99 = partitioned[k95], partitioned[k99]
+        total_errors = int(recent["error_count"].sum())
+        
         return {
             "period_hours": hours,
-            "total_operations": len(recent_metrics),
+            "total_operations": int(latency.size),
             "latency": {
-                "avg_ms": np.mean([m.latency_ms for m in recent_metrics]),
-                "p95_ms": np.percentile(
-                    [m.latency_ms for m in recent_metrics],
-                    95
-                ),
-                "p99_ms": np.percentile(
-                    [m.latency_ms for m in recent_metrics],
-                    99
-                )
+                "avg_ms": float(latency.mean()),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99)
             },
             "memory": {
-                "avg_mb": np.mean([m.memory_mb for m in recent_metrics]),
-                "peak_mb": max(m.memory_mb for m in recent_metrics)
+                "avg_mb": float(recent["memory_mb"].mean()),
+                "peak_mb": float(recent["memory_mb"].max())
             },
             "cpu": {
-                "avg_percent": np.mean(
-                    [m.cpu_percent for m in recent_metrics]
-                )
+                "avg_percent": float(recent["cpu_percent"].mean())
             },
             "errors": {
-                "total_count": sum(m.error_count for m in recent_metrics),
-                "error_rate": (
-                    sum(m.error_count for m in recent_metrics) /
-                    len(recent_metrics)
-                )
+                "total_count": total_errors,
+                "error_rate": total_errors / latency.size
             },
             "cache": {
-                "avg_hit_rate": np.mean(
-                    [m.cache_hit_rate for m in recent_metrics]
-                )
+                "avg_hit_rate": float(recent["cache_hit_rate"].mean())
             }
         }
         
@@ -341,11 +496,14 @@ class SystemMonitor:
         Returns:
             Error summary
         """
-        cutoff = datetime.utcnow() - timedelta(hours=hours)
-        recent_errors = [
-            e for e in self.error_history
-            if datetime.fromisoformat(e["timestamp"]) >= cutoff
-        ]
+        cutoff_ns = time.time_ns() - int(hours * 3600 * 1e9)
+        
+        recent_errors = []
+        for e in reversed(self.error_history):
+            if e["timestamp"] < cutoff_ns:
+                break
+            recent_errors.append(e)
+        recent_errors.reverse()
         
         if not recent_errors:
             return {
@@ -366,7 +524,7 @@ class SystemMonitor:
             if len(error_types[error_type]["examples"]) < 3:
                 error_types[error_type]["examples"].append({
                     "message": error["error_message"],
-                    "timestamp": error["timestamp"],
+                    "timestamp": _from_ns(error["timestamp"]).isoformat(),
                     "operation": error["operation"]
                 })
                 
@@ -406,7 +564,7 @@ def main():
         # Get performance summary
         summary = monitor.get_performance_summary(hours=1)
         logger.info("\nPerformance Summary:")
-        logger.info(json.dumps(summary, indent=2))
+        logger.info(orjson.dumps(summary, option=orjson.OPT_INDENT_2).decode())
         
     finally:
         monitor.close()
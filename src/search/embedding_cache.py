@@ -0,0 +1,75 @@
+"""Content-hash keyed cache for text embeddings."""
+
+from typing import Callable, List, Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import numpy as np
+
+class EmbeddingCache:
+    """LRU cache of embeddings keyed by a hash of the model name and text."""
+
+    def __init__(self, maxsize: int = 4096):
+        """Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of embeddings to keep
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str, model_name: str = "") -> str:
+        """Build the cache key for a text embedded by a given model."""
+        return hashlib.blake2b(
+            f"{model_name}\0{text}".encode(),
+            digest_size=16
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for key, if any."""
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+            return embedding
+
+    def put(self, key: str, embedding: np.ndarray):
+        """Store an embedding, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached embeddings."""
+        with self._lock:
+            self._entries.clear()
+
+    def encode(self,
+               texts: List[str],
+               encode_fn: Callable[[List[str]], np.ndarray],
+               model_name: str = "") -> np.ndarray:
+        """Embed texts, calling encode_fn only for cache misses.
+
+        Args:
+            texts: Texts to embed
+            encode_fn: Function embedding a list of texts into a 2D array
+            model_name: Model identifier, so different models never share entries
+
+        Returns:
+            Array of embeddings, one row per input text in input order
+        """
+        keys = [self.key(text, model_name) for text in texts]
+        embeddings = [self.get(key) for key in keys]
+
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if misses:
+            computed = np.asarray(encode_fn([texts[i] for i in misses]))
+            for i, embedding in zip(misses, computed):
+                self.put(keys[i], embedding)
+                embeddings[i] = embedding
+
+        return np.vstack(embeddings)
@@ -1,12 +1,24 @@
 """Enhanced hybrid search combining vector similarity and text-based matching."""
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
+from collections import OrderedDict
+import hashlib
+import threading
+import time
 import numpy as np
+import faiss
 from sentence_transformers import SentenceTransformer
+from sklearn.feature_extraction.text import CountVectorizer
+from .embedding_cache import EmbeddingCache
+
+try:
+    import simsimd
+except ImportError:  # Fall back to BLAS when SimSIMD is not installed
+    simsimd = None
 import re
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     """Search result with detailed scoring information."""
     text: str
@@ -18,59 +30,233 @@ class SearchResult:
 class HybridSearchEngine:
     """Enhanced search engine combining multiple ranking signals."""
     
+    # Corpus size above which the vector stage shortlists candidates from an
+    # HNSW index instead of scoring every document
+    ANN_THRESHOLD = 10_000
+    ANN_CANDIDATES = 200
+    
     def __init__(self, 
                  embedding_model,
                  vector_weight: float = 0.6,
-                 text_weight: float = 0.4):
+                 text_weight: float = 0.4,
+                 cache_size: int = 1024,
+                 cache_ttl_seconds: float = 300.0,
+                 quantize_embeddings: bool = False):
         """Initialize the search engine.
         
         Args:
             embedding_model: Model for generating embeddings
             vector_weight: Weight for vector similarity score
             text_weight: Weight for text matching score
+            cache_size: Maximum number of cached query results
+            cache_ttl_seconds: Seconds a cached result stays valid (0 disables)
+            quantize_embeddings: Store document embeddings, and the ANN index
+                on large corpora, as 8-bit codes (4x less memory, small loss
+                of precision)
         """
         self.embedding_model = embedding_model
         self.weights = {
             'vector': vector_weight,
             'text': text_weight
         }
+        self.quantize_embeddings = quantize_embeddings
         self.document_embeddings = None
+        self._embedding_scales = None
+        self._ann_index = None
         self.documents = []
+        self._token_vectorizer = None
+        self._doc_tokens = None
+        self._doc_token_counts = None
+        self._embedding_cache = EmbeddingCache()
+        
+        # LRU + TTL cache of search results, cleared whenever the index changes
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._result_cache: "OrderedDict[Tuple, Tuple[float, Tuple[SearchResult, ...]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+    def _get_cached_results(self, key: Tuple) -> Optional[Tuple[SearchResult, ...]]:
+        """Return cached results for key if present and not expired."""
+        if self.cache_ttl_seconds <= 0:
+            return None
+            
+        with self._cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is None:
+                return None
+                
+            stored_at, results = entry
+            if time.monotonic() - stored_at > self.cache_ttl_seconds:
+                del self._result_cache[key]
+                return None
+                
+            self._result_cache.move_to_end(key)
+            return results
+            
+    def _cache_results(self, key: Tuple, results: Tuple[SearchResult, ...]):
+        """Store results for key, evicting the least recently used entry."""
+        if self.cache_ttl_seconds <= 0:
+            return
+            
+        with self._cache_lock:
+            self._result_cache[key] = (time.monotonic(), results)
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.cache_size:
+                self._result_cache.popitem(last=False)
+                
+    @staticmethod
+    def _tokenize(text: str) -> set:
+        """Normalize and tokenize text into a set of lowercase terms."""
+        return set(text.lower().split())
+        
+    def _calculate_text_scores(self,
+                               query: str,
+                               rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Calculate Jaccard keyword similarity against indexed documents.
+        
+        Args:
+            query: Search query
+            rows: Document indices to score; all documents if omitted
+        """
+        query_tokens = self._tokenize(query)
+        doc_tokens = self._doc_tokens
+        doc_token_counts = self._doc_token_counts
+        if rows is not None:
+            doc_tokens = doc_tokens[rows]
+            doc_token_counts = doc_token_counts[rows]
         
-    def _calculate_text_similarity(self, query: str, text: str) -> float:
-        """Calculate text similarity score using keyword matching."""
-        # Normalize and tokenize
-        query_tokens = set(query.lower().split())
-        text_tokens = set(text.lower().split())
+        # Binary presence of in-vocabulary query tokens; out-of-vocabulary
+        # tokens still count toward the union via len(query_tokens)
+        query_vector = self._token_vectorizer.transform([query])
+        intersection = np.asarray(
+            (doc_tokens @ query_vector.T).todense()
+        ).ravel()
+        union = doc_token_counts + len(query_tokens) - intersection
         
-        # Calculate Jaccard similarity
-        intersection = len(query_tokens.intersection(text_tokens))
-        union = len(query_tokens.union(text_tokens))
+        return np.divide(
+            intersection,
+            union,
+            out=np.zeros(len(union)),
+            where=union > 0
+        )
         
-        return intersection / union if union > 0 else 0.0
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Quantize rows to int8 with a symmetric per-row scale.
         
-    def index_documents(self, documents: List[str]):
+        Returns:
+            Tuple of (int8 rows, float32 scale per row)
+        """
+        vectors = np.atleast_2d(vectors)
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, np.newaxis]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+        
+    def _vector_similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a normalized query against every document."""
+        if self._embedding_scales is not None:
+            query_quantized, query_scale = self._quantize(query_embedding)
+            # Cosine is scale-invariant, so SimSIMD can score the int8 rows directly
+            if simsimd is not None:
+                return 1 - np.asarray(simsimd.cdist(
+                    query_quantized,
+                    self.document_embeddings,
+                    metric="cosine"
+                ))[0]
+            dots = self.document_embeddings @ query_quantized[0].astype(np.int32)
+            return dots.astype(np.float32) * self._embedding_scales * query_scale[0]
+            
+        # Rows and query are normalized at encode time, so the dot product is
+        # the cosine: SimSIMD's ISA-dispatched dot kernel when available,
+        # otherwise a single matrix-vector product
+        if simsimd is not None:
+            return np.asarray(simsimd.cdist(
+                query_embedding[np.newaxis, :],
+                self.document_embeddings,
+                metric="dot"
+            ))[0]
+        return self.document_embeddings @ query_embedding
+        
+    def index_documents(self,
+                        documents: List[str],
+                        embeddings: Optional[np.ndarray] = None):
         """Create searchable index from documents.
         
         Args:
             documents: List of document texts to index
+            embeddings: Precomputed normalized embeddings, one row per document
         """
         self.documents = documents
+        with self._cache_lock:
+            self._result_cache.clear()
         
-        # Generate embeddings for all documents
-        embeddings = []
-        for doc in documents:
-            embedding = self.embedding_model.encode(doc)
-            embeddings.append(embedding)
+        # Generate embeddings in batched forward passes, only for documents
+        # not seen before; normalized rows make the dot product a true cosine
+        if embeddings is None:
+            embeddings = self._embedding_cache.encode(
+                documents,
+                lambda texts: self.embedding_model.encode(
+                    texts,
+                    batch_size=32,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+            )
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.quantize_embeddings:
+            self.document_embeddings, self._embedding_scales = self._quantize(embeddings)
+        else:
+            self.document_embeddings = embeddings
+            self._embedding_scales = None
+        self._ann_index = self._build_ann_index(embeddings)
+        
+        # Precompute a document x vocabulary token-presence matrix using the
+        # same lowercase/whitespace tokenization as _tokenize
+        self._token_vectorizer = CountVectorizer(
+            binary=True,
+            lowercase=True,
+            tokenizer=str.split,
+            token_pattern=None
+        )
+        self._doc_tokens = self._token_vectorizer.fit_transform(documents)
+        self._doc_token_counts = np.asarray(self._doc_tokens.sum(axis=1)).ravel()
+
+    def _build_ann_index(self, embeddings: np.ndarray) -> Optional["faiss.Index"]:
+        """Build an inner-product HNSW index for large corpora, else None.
+        
+        With quantize_embeddings the graph stores 8-bit scalar-quantized
+        vectors, so the index does not hold a float32 copy of the corpus.
+        """
+        if len(embeddings) <= self.ANN_THRESHOLD:
+            return None
             
-        self.document_embeddings = np.vstack(embeddings)
+        if self.quantize_embeddings:
+            index = faiss.IndexHNSWSQ(
+                embeddings.shape[1],
+                faiss.ScalarQuantizer.QT_8bit,
+                32,
+                faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(embeddings)
+        else:
+            index = faiss.IndexHNSWFlat(embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = 40
+        index.hnsw.efSearch = max(64, self.ANN_CANDIDATES)
+        index.add(embeddings)
+        return index
 
-    def search(self, query: str, top_k: int = 5) -> List[SearchResult]:
+    def search(self,
+               query: str,
+               top_k: int = 5,
+               query_embedding: Optional[np.ndarray] = None) -> List[SearchResult]:
         """Perform hybrid search.
         
         Args:
             query: Search query
             top_k: Number of results to return
+            query_embedding: Precomputed normalized query embedding, if available
             
         Returns:
             List of search results
@@ -78,39 +264,77 @@ class HybridSearchEngine:
         if self.document_embeddings is None:
             raise ValueError("No documents indexed. Call index_documents first.")
             
-        # Get query embedding
-        query_embedding = self.embedding_model.encode(query)
+        # A caller-supplied embedding decides the results, so it is part of
+        # the key; None means the query text is embedded here
+        embedding_key = None
+        if query_embedding is not None:
+            query_embedding = np.asarray(query_embedding, dtype=np.float32)
+            embedding_key = hashlib.blake2b(
+                query_embedding.tobytes(), digest_size=16
+            ).hexdigest()
+        cache_key = (query, embedding_key, top_k, self.weights['vector'], self.weights['text'])
+        cached = self._get_cached_results(cache_key)
+        if cached is not None:
+            return list(cached)
+            
+        # Get query embedding as float32 so the dot product does not upcast
+        # (and copy) the whole document matrix; repeated queries are served
+        # from the content-hash embedding cache
+        if query_embedding is None:
+            query_embedding = self._embedding_cache.encode(
+                [query],
+                lambda texts: self.embedding_model.encode(
+                    texts,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False
+                )
+            )[0]
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
         
-        # Calculate vector similarities
-        similarities = np.dot(self.document_embeddings, query_embedding)
+        # Calculate vector similarities; large corpora are first narrowed to
+        # the nearest candidates, the rest score over the whole corpus
+        if self._ann_index is not None:
+            similarities, candidates = self._ann_index.search(
+                query_embedding[np.newaxis, :],
+                max(self.ANN_CANDIDATES, top_k)
+            )
+            found = candidates[0] >= 0
+            doc_ids = candidates[0][found]
+            similarities = similarities[0][found]
+        else:
+            doc_ids = None
+            similarities = self._vector_similarities(query_embedding)
         vector_scores = (similarities + 1) / 2  # Normalize to [0,1]
         
-        # Calculate text match scores
-        text_scores = []
-        for doc in self.documents:
-            score = self._calculate_text_similarity(query, doc)
-            text_scores.append(score)
+        # Calculate text match scores for all scored documents at once
+        text_scores = self._calculate_text_scores(query, doc_ids)
             
         # Combine scores
-        results = []
-        for i, (doc, vector_score, text_score) in enumerate(zip(
-            self.documents, vector_scores, text_scores
-        )):
-            final_score = (
-                vector_score * self.weights['vector'] +
-                text_score * self.weights['text']
+        final_scores = (
+            vector_scores * self.weights['vector'] +
+            text_scores * self.weights['text']
+        )
+        
+        # Select the top k in O(n), then order just those (ties keep corpus order)
+        if top_k < len(final_scores):
+            top_indices = np.sort(np.argpartition(-final_scores, top_k)[:top_k])
+        else:
+            top_indices = np.arange(len(final_scores))
+        top_indices = top_indices[np.argsort(-final_scores[top_indices], kind="stable")]
+        
+        # Only materialize result objects for the selected rows
+        top_results = [
+            SearchResult(
+                text=self.documents[i if doc_ids is None else doc_ids[i]],
+                vector_score=float(vector_scores[i]),
+                text_match_score=float(text_scores[i]),
+                final_score=float(final_scores[i])
             )
-            
-            results.append(SearchResult(
-                text=doc,
-                vector_score=float(vector_score),
-                text_match_score=text_score,
-                final_score=final_score
-            ))
-            
-        # Sort by final score and return top k
-        results.sort(key=lambda x: x.final_score, reverse=True)
-        return results[:top_k]
+            for i in top_indices
+        ]
+        self._cache_results(cache_key, tuple(top_results))
+        return top_results
         
     def explain_results(self, results: List[SearchResult]) -> Dict[str, Any]:
         """Generate explanation of search results.
@@ -121,19 +345,30 @@ class HybridSearchEngine:
         Returns:
             Dictionary with result explanations
         """
-        explanations = []
+        final_scores = np.fromiter(
+            (r.final_score for r in results), dtype=float, count=len(results)
+        )
+        vector_scores = np.fromiter(
+            (r.vector_score for r in results), dtype=float, count=len(results)
+        )
+        text_scores = np.fromiter(
+            (r.text_match_score for r in results), dtype=float, count=len(results)
+        )
         
-        for result in results:
-            # Calculate score contributions
-            vector_contribution = (
-                result.vector_score * self.weights['vector'] /
-                result.final_score * 100
-            )
-            text_contribution = (
-                result.text_match_score * self.weights['text'] /
-                result.final_score * 100
-            )
-            
+        # Calculate score contributions for all results at once; the floor
+        # on the denominator keeps zero-score results from dividing by zero
+        denominators = np.maximum(final_scores, 1e-9)
+        vector_contributions = (
+            vector_scores * self.weights['vector'] / denominators
+        ) * 100
+        text_contributions = (
+            text_scores * self.weights['text'] / denominators
+        ) * 100
+        
+        explanations = []
+        for result, vector_contribution, text_contribution in zip(
+            results, vector_contributions, text_contributions
+        ):
             explanation = {
                 "text": result.text[:200] + "..." if len(result.text) > 200 else result.text,
                 "final_score": f"{result.final_score:.3f}",
@@ -149,10 +384,10 @@ class HybridSearchEngine:
             "results": explanations,
             "summary": {
                 "total_results": len(results),
-                "avg_score": np.mean([r.final_score for r in results]),
+                "avg_score": float(final_scores.mean()) if len(results) else 0.0,
                 "score_range": {
-                    "min": min(r.final_score for r in results),
-                    "max": max(r.final_score for r in results)
+                    "min": float(final_scores.min()) if len(results) else 0.0,
+                    "max": float(final_scores.max()) if len(results) else 0.0
                 }
             }
         }
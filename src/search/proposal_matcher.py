@@ -1,11 +1,30 @@
 """Proposal section matcher for SOW requirements."""
 
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+import hashlib
 import re
-from .vector_search import ProposalVectorizer, SearchResult as VectorSearchResult
+import numpy as np
+from .vector_search import (
+    ProposalVectorizer,
+    SearchResult as VectorSearchResult,
+    _SECTION_SPLIT_RE
+)
 from .hybrid_search import HybridSearchEngine, SearchResult as HybridSearchResult
 
+_SECTION_ID_RE = re.compile(r'\b(\d+\.\d+\.\d+)\b')
+
+@lru_cache(maxsize=8192)
+def _extract_section_id(text: str) -> Optional[str]:
+    """Extract section ID in X.X.X format, memoized per unique text.
+    
+    The same chunks come back from both searches and across requirements,
+    so most lookups are cache hits.
+    """
+    match = _SECTION_ID_RE.search(text)
+    return match.group(1) if match else None
+
 @dataclass
 class MatchResult:
     """Result of matching a requirement to proposal sections."""
@@ -32,6 +51,7 @@ class ProposalMatcher:
             text_weight: Weight for text matching score
             section_weight: Weight for section ID matching score
         """
+        self.embedding_model = embedding_model
         self.vector_search = ProposalVectorizer()
         self.hybrid_search = HybridSearchEngine(
             embedding_model,
@@ -43,12 +63,12 @@ class ProposalMatcher:
             'text': text_weight,
             'section': section_weight
         }
+        self._indexed_hash: Optional[str] = None
+        self._has_sections = False
 
     def _extract_section_id(self, text: str) -> Optional[str]:
         """Extract section ID in X.X.X format."""
-        pattern = r'\b(\d+\.\d+\.\d+)\b'
-        match = re.search(pattern, text)
-        return match.group(1) if match else None
+        return _extract_section_id(text)
 
     def _calculate_section_similarity(self, req_section: str, prop_section: str) -> float:
         """Calculate similarity between section IDs."""
@@ -69,6 +89,31 @@ class ProposalMatcher:
                 
         return matching_parts / len(req_parts)
 
+    def _calculate_section_similarities(self,
+                                        req_section: str,
+                                        prop_sections: List[str]) -> np.ndarray:
+        """Calculate section similarity of one requirement against many sections.
+        
+        Vectorized equivalent of _calculate_section_similarity: section ID
+        parts are laid out as a string matrix and the matching prefix length is
+        taken with a cumulative product over the per-part comparisons. Parts
+        compare as strings, so "01" does not match "1".
+        """
+        if not req_section or not prop_sections:
+            return np.zeros(len(prop_sections))
+            
+        req_parts = np.array(req_section.split('.'), dtype=object)
+        width = len(req_parts)
+        
+        # Pad short proposal IDs with None, which never equals a part
+        prop_parts = np.full((len(prop_sections), width), None, dtype=object)
+        for row, section_id in enumerate(prop_sections):
+            parts = section_id.split('.')[:width]
+            prop_parts[row, :len(parts)] = parts
+            
+        matching_parts = np.cumprod(prop_parts == req_parts, axis=1).sum(axis=1)
+        return matching_parts / width
+
     def _combine_search_results(self, 
                               vector_results: List[VectorSearchResult],
                               hybrid_results: List[HybridSearchResult],
@@ -80,16 +125,12 @@ class ProposalMatcher:
         for result in vector_results:
             section_id = self._extract_section_id(result.chunk.text)
             if section_id:
-                section_score = self._calculate_section_similarity(
-                    requirement_section, section_id
-                ) if requirement_section else 0.0
-                
                 combined_results[section_id] = {
                     'section_id': section_id,
                     'text': result.chunk.text,
                     'vector_score': result.similarity_score,
                     'text_score': 0.0,  # Will be updated from hybrid results
-                    'section_score': section_score
+                    'section_score': 0.0  # Scored in one batch below
                 }
 
         # Process hybrid search results
@@ -99,32 +140,39 @@ class ProposalMatcher:
                 if section_id in combined_results:
                     combined_results[section_id]['text_score'] = result.text_match_score
                 else:
-                    section_score = self._calculate_section_similarity(
-                        requirement_section, section_id
-                    ) if requirement_section else 0.0
-                    
                     combined_results[section_id] = {
                         'section_id': section_id,
                         'text': result.text,
                         'vector_score': result.vector_score,
                         'text_score': result.text_match_score,
-                        'section_score': section_score
+                        'section_score': 0.0
                     }
 
-        # Calculate final scores
-        for result in combined_results.values():
-            result['final_score'] = (
-                result['vector_score'] * self.weights['vector'] +
-                result['text_score'] * self.weights['text'] +
-                result['section_score'] * self.weights['section']
+        # Score every candidate section ID against the requirement at once
+        if requirement_section:
+            section_scores = self._calculate_section_similarities(
+                requirement_section, list(combined_results)
             )
+            for result, section_score in zip(combined_results.values(), section_scores):
+                result['section_score'] = float(section_score)
 
-        # Sort by final score and convert to list
-        sorted_results = sorted(
-            combined_results.values(),
-            key=lambda x: x['final_score'],
-            reverse=True
+        # Calculate final scores for all candidates in one array expression
+        results = list(combined_results.values())
+        vector_scores, text_scores, section_scores = (
+            np.fromiter((r[key] for r in results), dtype=np.float64, count=len(results))
+            for key in ('vector_score', 'text_score', 'section_score')
         )
+        final_scores = (
+            self.weights['vector'] * vector_scores +
+            self.weights['text'] * text_scores +
+            self.weights['section'] * section_scores
+        )
+
+        # Sort by final score (ties keep insertion order) and convert to list
+        sorted_results = []
+        for i in np.argsort(-final_scores, kind="stable"):
+            results[i]['final_score'] = float(final_scores[i])
+            sorted_results.append(results[i])
 
         return sorted_results
 
@@ -172,31 +220,70 @@ class ProposalMatcher:
             
         return explanation, improvements
 
-    def match_requirement(self, 
-                         requirement_text: str,
-                         proposal_text: str,
-                         requirement_id: Optional[str] = None) -> MatchResult:
-        """Match a requirement to sections in the proposal.
+    def index_proposal(self, proposal_text: str):
+        """Index proposal text, skipping the work if it is already indexed.
         
         Args:
-            requirement_text: The requirement text to match
             proposal_text: The proposal text to search in
-            requirement_id: Optional requirement ID for better section matching
-            
+        """
+        self._index_and_encode(proposal_text, [])
+
+    def _index_and_encode(self,
+                          proposal_text: str,
+                          requirement_texts: Sequence[str]) -> np.ndarray:
+        """Index the proposal if needed and embed requirements for hybrid search.
+        
+        When the proposal is new, its sections are embedded in the same
+        encode call as the requirements, so one batched forward pass covers
+        both instead of one call per side.
+        
         Returns:
-            MatchResult containing matched sections and scoring information
+            Normalized requirement embeddings, one row per requirement
         """
-        # Extract section ID from requirement if not provided
-        if not requirement_id:
-            requirement_id = self._extract_section_id(requirement_text)
-            
-        # Initialize search indices
-        self.vector_search.index_proposal(proposal_text)
+        proposal_hash = hashlib.sha1(proposal_text.encode()).hexdigest()
+        is_new = proposal_hash != self._indexed_hash
+        sections = [
+            match.group(0).strip() for match in _SECTION_SPLIT_RE.finditer(proposal_text)
+        ] if is_new else []
         
-        # Perform searches
-        vector_results = self.vector_search.search(requirement_text, top_k=5)
-        hybrid_results = self.hybrid_search.search(requirement_text)
+        texts = list(requirement_texts) + sections
+        embeddings = self.embedding_model.encode(
+            texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ) if texts else np.empty((0, 0), dtype=np.float32)
         
+        if is_new:
+            self.vector_search.index_proposal(proposal_text)
+            self._has_sections = bool(sections)
+            if sections:
+                self.hybrid_search.index_documents(
+                    sections,
+                    embeddings=embeddings[len(requirement_texts):]
+                )
+            self._indexed_hash = proposal_hash
+            
+        return embeddings[:len(requirement_texts)]
+
+    def _hybrid_search(self,
+                       requirement_text: str,
+                       query_embedding: np.ndarray) -> List[HybridSearchResult]:
+        """Run hybrid search, or return nothing if the proposal has no sections."""
+        if not self._has_sections:
+            return []
+        return self.hybrid_search.search(
+            requirement_text,
+            query_embedding=query_embedding
+        )
+
+    def _build_match_result(self,
+                            requirement_text: str,
+                            requirement_id: Optional[str],
+                            vector_results: List[VectorSearchResult],
+                            hybrid_results: List[HybridSearchResult]) -> MatchResult:
+        """Combine search results for one requirement into a MatchResult."""
         # Combine and score results
         matched_sections = self._combine_search_results(
             vector_results,
@@ -221,3 +308,71 @@ class ProposalMatcher:
             match_explanation=explanation,
             suggested_improvements=improvements
         )
+
+    def match_requirement(self, 
+                         requirement_text: str,
+                         proposal_text: str,
+                         requirement_id: Optional[str] = None) -> MatchResult:
+        """Match a requirement to sections in the proposal.
+        
+        Args:
+            requirement_text: The requirement text to match
+            proposal_text: The proposal text to search in
+            requirement_id: Optional requirement ID for better section matching
+            
+        Returns:
+            MatchResult containing matched sections and scoring information
+        """
+        # Extract section ID from requirement if not provided
+        if not requirement_id:
+            requirement_id = self._extract_section_id(requirement_text)
+            
+        # Initialize search indices (no-op if this proposal is already indexed);
+        # the requirement is embedded alongside any new proposal sections
+        query_embedding = self._index_and_encode(proposal_text, [requirement_text])[0]
+        
+        # Perform searches
+        vector_results = self.vector_search.search(requirement_text, top_k=5)
+        hybrid_results = self._hybrid_search(requirement_text, query_embedding)
+        
+        return self._build_match_result(
+            requirement_text,
+            requirement_id,
+            vector_results,
+            hybrid_results
+        )
+
+    def match_requirements(self,
+                           requirement_texts: List[str],
+                           proposal_text: str) -> List[MatchResult]:
+        """Match several requirements against one proposal.
+        
+        The proposal is indexed once and all requirements are embedded and
+        searched in a single batch.
+        
+        Args:
+            requirement_texts: The requirement texts to match
+            proposal_text: The proposal text to search in
+            
+        Returns:
+            One MatchResult per requirement, in input order
+        """
+        # Encode every requirement for the hybrid engine in one batch, together
+        # with the proposal sections if the proposal is not yet indexed
+        hybrid_embeddings = self._index_and_encode(proposal_text, requirement_texts)
+        
+        vector_batch = self.vector_search.search_batch(requirement_texts, top_k=5)
+        
+        results = []
+        for i, (requirement_text, vector_results) in enumerate(
+            zip(requirement_texts, vector_batch)
+        ):
+            hybrid_results = self._hybrid_search(requirement_text, hybrid_embeddings[i])
+            results.append(self._build_match_result(
+                requirement_text,
+                self._extract_section_id(requirement_text),
+                vector_results,
+                hybrid_results
+            ))
+            
+        return results
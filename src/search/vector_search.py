@@ -1,12 +1,17 @@
 """Vector-based semantic search for proposal matching."""
 
 import numpy as np
-from typing import List, Dict, Tuple
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Tuple, Union, Optional
 import faiss
 from transformers import AutoTokenizer, AutoModel
 import torch
 from dataclasses import dataclass
 import re
+import os
+import mmap
+from .embedding_cache import EmbeddingCache
 
 @dataclass
 class ChunkMetadata:
@@ -22,113 +27,319 @@ class SearchResult:
     chunk: ChunkMetadata
     similarity_score: float
 
+@lru_cache(maxsize=1)
+def _load_model(model_name: str):
+    """Load a tokenizer/model pair once and share it.
+    
+    Only the latest model is kept, so switching models releases the
+    previous pair.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    if torch.cuda.is_available():
+        # Half precision halves memory traffic for the forward pass on GPU
+        model = model.half().to("cuda")
+    model.eval()
+    return tokenizer, model
+
+_SECTION_SPLIT_RE = re.compile(
+    r'(?:(?<=\n)|^)(\d+\.\d+\.\d+)\s*(.*?)(?=\n\s*\d+\.\d+\.\d+|$)',
+    re.DOTALL
+)
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+# Same pattern over bytes, for scanning memory-mapped files
+_SECTION_SPLIT_BYTES_RE = re.compile(_SECTION_SPLIT_RE.pattern.encode(), re.DOTALL)
+
+# Shared across instances; keys include the model name
+_EMBEDDING_CACHE = EmbeddingCache(maxsize=4096)
+
 class ProposalVectorizer:
     """Handles text vectorization and semantic search."""
     
+    # Corpus sizes above which approximate indexes replace exact search
+    HNSW_THRESHOLD = 1_000
+    IVFPQ_THRESHOLD = 100_000
+    
     def __init__(self, model_name: str = "sentence-transformers/all-mpnet-base-v2"):
         """Initialize with a specific model."""
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name)
+        self.model_name = model_name
+        self.tokenizer, self.model = _load_model(model_name)
         self.index = None
-        self.chunks = []
+        # Indexed chunks are stored column-wise; ChunkMetadata objects are
+        # only built for the chunks a search returns
+        self._section_ids = np.empty(0, dtype=object)
+        self._texts: List[str] = []
+        self._starts = np.empty(0, dtype=np.int32)
+        self._ends = np.empty(0, dtype=np.int32)
+        
+    @property
+    def chunks(self) -> List[ChunkMetadata]:
+        """Metadata for every chunk in the current index."""
+        return [self._chunk(i) for i in range(len(self._texts))]
+        
+    def _chunk(self, idx: int) -> ChunkMetadata:
+        """Build the metadata for the indexed chunk at position idx."""
+        return ChunkMetadata(
+            section_id=self._section_ids[idx],
+            text=self._texts[idx],
+            start_char=int(self._starts[idx]),
+            end_char=int(self._ends[idx])
+        )
         
     def _create_chunks(self, text: str, max_length: int = 512) -> List[ChunkMetadata]:
         """Split text into chunks, preserving section structure."""
-        chunks = []
-        
         # Find sections with X.X.X format
-        section_pattern = r'(?:(?<=\n)|^)(\d+\.\d+\.\d+)\s*(.*?)(?=\n\s*\d+\.\d+\.\d+|$)'
-        current_pos = 0
+        sections = (
+            (match.group(1), match.group(2), match.start(2), match.end(2))
+            for match in _SECTION_SPLIT_RE.finditer(text)
+        )
+        return self._chunk_sections(sections, max_length)
+
+    def _create_chunks_from_file(self, path: Union[str, os.PathLike], max_length: int = 512) -> List[ChunkMetadata]:
+        """Split a UTF-8 proposal file into chunks without reading it into memory.
         
-        for match in re.finditer(section_pattern, text, re.DOTALL):
-            section_id = match.group(1)
-            content = match.group(2).strip()
+        The section regex runs directly over a read-only memory map, and only
+        the matched section bodies are decoded. Chunk offsets are character
+        offsets into the decoded file, as with _create_chunks.
+        """
+        if os.path.getsize(path) == 0:
+            return []
+            
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return self._chunk_sections(self._file_sections(mm), max_length)
+
+    @staticmethod
+    def _file_sections(mm: mmap.mmap) -> Iterator[Tuple[str, str, int, int]]:
+        """Yield (section_id, content, start, end) for each section in mm.
+        
+        Byte offsets are converted to character offsets by decoding the bytes
+        between consecutive matches once, in order. Match boundaries always
+        fall next to ASCII bytes, so no slice splits a UTF-8 sequence.
+        """
+        byte_pos = 0
+        char_pos = 0
+        for match in _SECTION_SPLIT_BYTES_RE.finditer(mm):
+            char_pos += len(mm[byte_pos:match.start(2)].decode("utf-8", errors="replace"))
+            content = match.group(2).decode("utf-8", errors="replace")
+            yield match.group(1).decode("ascii"), content, char_pos, char_pos + len(content)
+            byte_pos = match.end(2)
+            char_pos += len(content)
+
+    def _chunk_sections(self,
+                        sections: Iterable[Tuple[str, str, int, int]],
+                        max_length: int) -> List[ChunkMetadata]:
+        """Turn (section_id, content, start, end) spans into chunks.
+        
+        Sections longer than max_length are split on sentence boundaries.
+        """
+        chunks = []
+        
+        for section_id, raw_content, content_start, content_end in sections:
+            content = raw_content.strip()
             
             # Further split long sections
             if len(content) > max_length:
-                sentences = re.split(r'(?<=[.!?])\s+', content)
-                current_chunk = ""
-                chunk_start = match.start(2)
+                sentences = _SENTENCE_RE.split(content)
+                # Collect sentences in a list and join once per chunk;
+                # repeated string concatenation is quadratic
+                parts = []
+                parts_len = 0
+                chunk_start = content_start
                 
                 for sentence in sentences:
-                    if len(current_chunk) + len(sentence) > max_length and current_chunk:
+                    if parts and parts_len + len(sentence) > max_length:
+                        chunk_text = " ".join(parts)
+                        chunk_len = len(chunk_text)
                         chunks.append(ChunkMetadata(
                             section_id=section_id,
-                            text=current_chunk.strip(),
+                            text=chunk_text.strip(),
                             start_char=chunk_start,
-                            end_char=chunk_start + len(current_chunk)
+                            end_char=chunk_start + chunk_len
                         ))
-                        current_chunk = sentence
-                        chunk_start = chunk_start + len(current_chunk)
+                        # Next chunk starts after this one and its separator
+                        chunk_start = chunk_start + chunk_len + 1
+                        parts = [sentence]
+                        parts_len = len(sentence)
                     else:
-                        current_chunk += " " + sentence if current_chunk else sentence
+                        parts_len += len(sentence) + 1 if parts else len(sentence)
+                        parts.append(sentence)
                 
-                if current_chunk:
+                if parts:
+                    chunk_text = " ".join(parts)
                     chunks.append(ChunkMetadata(
                         section_id=section_id,
-                        text=current_chunk.strip(),
+                        text=chunk_text.strip(),
                         start_char=chunk_start,
-                        end_char=chunk_start + len(current_chunk)
+                        end_char=chunk_start + len(chunk_text)
                     ))
             else:
                 chunks.append(ChunkMetadata(
                     section_id=section_id,
                     text=content,
-                    start_char=match.start(2),
-                    end_char=match.end(2)
+                    start_char=content_start,
+                    end_char=content_end
                 ))
-            
-            current_pos = match.end()
         
         return chunks
 
-    def _get_embedding(self, text: str) -> np.ndarray:
-        """Generate embedding for a text string."""
-        inputs = self.tokenizer(text, padding=True, truncation=True, return_tensors="pt", max_length=512)
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            # Use mean pooling
-            embeddings = outputs.last_hidden_state.mean(dim=1)
-        return embeddings.numpy()
-
-    def index_proposal(self, proposal_text: str):
-        """Create searchable index from proposal text."""
+    def _get_embedding(self, text: Union[str, List[str]]) -> np.ndarray:
+        """Generate embeddings for a text string or a batch of strings.
+        
+        Previously seen texts are served from the content-hash cache.
+        """
+        texts = [text] if isinstance(text, str) else text
+        return _EMBEDDING_CACHE.encode(texts, self._embed_batch, self.model_name)
+
+    def _embed_batch(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Run the transformer over texts in length-sorted mini-batches.
+        
+        Texts are tokenized once, then grouped by token length so each
+        mini-batch carries as little padding as possible. The next batch is
+        padded on a worker thread while the model runs on the current one.
+        """
+        encodings = self.tokenizer(texts, truncation=True, max_length=512)
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+        order = np.argsort(lengths, kind="stable")
+        batches = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+        
+        embeddings = np.empty((len(texts), self.model.config.hidden_size), dtype=np.float32)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self._prepare_batch, encodings, batches[0]) if batches else None
+            for n, batch_idx in enumerate(batches):
+                host_inputs = pending.result()
+                if n + 1 < len(batches):
+                    pending = executor.submit(self._prepare_batch, encodings, batches[n + 1])
+                inputs = {
+                    key: tensor.to(self.model.device, non_blocking=True)
+                    for key, tensor in host_inputs.items()
+                }
+                with torch.inference_mode():
+                    outputs = self.model(**inputs)
+                    # Use mean pooling over real tokens only, so padding added for
+                    # batching does not change an embedding
+                    mask = inputs["attention_mask"].unsqueeze(-1).float()
+                    summed = (outputs.last_hidden_state * mask).sum(dim=1)
+                    pooled = summed / mask.sum(dim=1).clamp(min=1)
+                # Scatter back to the original text order
+                embeddings[batch_idx] = pooled.float().cpu().numpy()
+        return embeddings
+
+    def _prepare_batch(self, encodings, batch_idx: np.ndarray) -> Dict[str, torch.Tensor]:
+        """Pad one mini-batch into host tensors ready to copy to the model device.
+        
+        On GPU the tensors are pinned so the host-to-device copy can run
+        asynchronously.
+        """
+        inputs = self.tokenizer.pad(
+            [{key: encodings[key][i] for key in encodings.keys()} for i in batch_idx],
+            return_tensors="pt"
+        )
+        if self.model.device.type == "cuda":
+            return {key: tensor.pin_memory() for key, tensor in inputs.items()}
+        return dict(inputs)
+
+    def index_proposal(self, proposal: Union[str, os.PathLike]):
+        """Create searchable index from proposal text.
+        
+        Args:
+            proposal: Proposal text, or a path to a UTF-8 proposal file; files
+                are memory-mapped rather than loaded whole
+        """
         # Create chunks
-        self.chunks = self._create_chunks(proposal_text)
+        if isinstance(proposal, os.PathLike):
+            chunks = self._create_chunks_from_file(proposal)
+        else:
+            chunks = self._create_chunks(proposal)
+        self._section_ids = np.array([chunk.section_id for chunk in chunks], dtype=object)
+        self._texts = [chunk.text for chunk in chunks]
+        self._starts = np.fromiter(
+            (chunk.start_char for chunk in chunks), dtype=np.int32, count=len(chunks)
+        )
+        self._ends = np.fromiter(
+            (chunk.end_char for chunk in chunks), dtype=np.int32, count=len(chunks)
+        )
         
-        # Generate embeddings
-        embeddings = []
-        for chunk in self.chunks:
-            embedding = self._get_embedding(chunk.text)
-            embeddings.append(embedding)
+        # Generate embeddings for all chunks in one batched forward pass
+        embeddings_array = np.ascontiguousarray(
+            self._get_embedding(self._texts),
+            dtype='float32'
+        )
         
-        # Stack embeddings and create FAISS index
-        embeddings_array = np.vstack(embeddings)
-        dimension = embeddings_array.shape[1]
+        # Unit-length vectors make inner product cosine
+        faiss.normalize_L2(embeddings_array)
+        self.index = self._build_index(embeddings_array)
         
-        # Initialize FAISS index
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings_array.astype('float32'))
+    def _build_index(self, embeddings: np.ndarray) -> "faiss.Index":
+        """Build an inner-product FAISS index sized to the corpus.
+        
+        Small corpora use exact search; larger ones use HNSW, and very large
+        ones a trained IVF-PQ index, trading a little recall for sublinear
+        query time.
+        """
+        count, dimension = embeddings.shape
+        if count > self.IVFPQ_THRESHOLD and dimension % 8 == 0:
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, 1024, dimension // 8, 8,
+                faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(embeddings)
+            index.nprobe = 16
+        elif count > self.HNSW_THRESHOLD:
+            index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = 40
+            index.hnsw.efSearch = 64
+        else:
+            index = faiss.IndexFlatIP(dimension)
+        index.add(embeddings)
+        return index
 
-    def search(self, requirement_text: str, top_k: int = 3) -> List[SearchResult]:
+    def search(self,
+               requirement_text: str,
+               top_k: int = 3,
+               query_embedding: Optional[np.ndarray] = None) -> List[SearchResult]:
         """Search for most similar proposal chunks to a requirement."""
+        if query_embedding is not None:
+            query_embedding = np.reshape(query_embedding, (1, -1))
+        return self.search_batch(
+            [requirement_text],
+            top_k=top_k,
+            query_embeddings=query_embedding
+        )[0]
+
+    def search_batch(self,
+                     requirement_texts: List[str],
+                     top_k: int = 3,
+                     query_embeddings: Optional[np.ndarray] = None) -> List[List[SearchResult]]:
+        """Search for the most similar proposal chunks to several requirements.
+        
+        All requirements are embedded in one forward pass (unless embeddings
+        from this model are passed in) and queried against the index in a
+        single call.
+        """
         if not self.index:
             raise ValueError("No index exists. Call index_proposal first.")
         
-        # Get requirement embedding
-        query_embedding = self._get_embedding(requirement_text)
+        # Get requirement embeddings
+        if query_embeddings is None:
+            query_embeddings = self._get_embedding(requirement_texts)
+        query_embeddings = np.array(query_embeddings, dtype='float32', order='C')
+        faiss.normalize_L2(query_embeddings)
         
         # Search index
-        distances, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        similarities, indices = self.index.search(query_embeddings, top_k)
         
         # Convert to search results
-        results = []
-        for distance, idx in zip(distances[0], indices[0]):
-            # Convert L2 distance to similarity score (inverse and normalize)
-            similarity = 1 / (1 + distance)
-            results.append(SearchResult(
-                chunk=self.chunks[idx],
-                similarity_score=float(similarity)
-            ))
-        
-        return results
+        batch_results = []
+        for row_similarities, row_indices in zip(similarities, indices):
+            results = []
+            for similarity, idx in zip(row_similarities, row_indices):
+                if idx < 0:  # Fewer chunks than top_k
+                    continue
+                results.append(SearchResult(
+                    chunk=self._chunk(idx),
+                    similarity_score=float(similarity)
+                ))
+            batch_results.append(results)
+        
+        return batch_results
@@ -122,6 +122,22 @@ def test_parse_sections_with_formatting():
     assert 'overview section' in sections[0]['content'].lower()
     assert 'scope details' in sections[1]['content'].lower()
 
+def test_parse_sections_keeps_prose_ellipsis():
+    """Test that an ellipsis inside prose is not treated as a dot leader."""
+    processor = SOWProcessor()
+    text = """
+    A.1 Reporting
+    The contractor shall... deliver reports monthly.
+    Next line 5.
+    """
+    
+    sections = processor._parse_sections(text)
+    
+    assert len(sections) == 1
+    assert 'deliver reports monthly' in sections[0]['content']
+    assert 'Next line 5.' in sections[0]['content']
+    assert 'deliver reports' in processor._clean_content("shall... deliver reports")
+
 def test_parse_sections_empty_or_invalid():
     """Test handling of empty or invalid sections."""
     processor = SOWProcessor()
@@ -136,10 +152,35 @@ def test_parse_sections_empty_or_invalid():
     
     sections = processor._parse_sections(text)
     
-    # Should only include sections with substantial content
-    assert len(sections) == 1
-    assert sections[0]['id'] == 'A.3'
-    assert 'valid section' in sections[0]['content'].lower()
+    # An ID with no title and no body is dropped; a title alone is content
+    assert [section['id'] for section in sections] == ['A.2', 'A.3']
+    assert sections[0]['content'] == 'Empty Section'
+    assert 'valid section' in sections[1]['content'].lower()
+
+def test_parse_sections_header_variants():
+    """Test IDs on their own line, bare letter IDs, and numbered prose."""
+    processor = SOWProcessor()
+    text = """
+    A.
+    General provisions apply.
+    
+    C.1
+    The contractor shall provide support.
+    1.1 Numbered prose stays in the section.
+    2.3 So does this line.
+    
+    1.2.3 Deliverables
+    Reports are due monthly.
+    """
+    
+    sections = processor._parse_sections(text)
+    
+    assert [section['id'] for section in sections] == ['A.', 'C.1', '1.2.3']
+    assert 'general provisions' in sections[0]['content'].lower()
+    assert 'contractor shall provide support' in sections[1]['content']
+    assert 'Numbered prose stays' in sections[1]['content']
+    assert 'So does this line' in sections[1]['content']
+    assert 'deliverables' in sections[2]['content'].lower()
 
 def test_clean_content():
     """Test content cleaning functionality."""
@@ -0,0 +1,54 @@
+"""Shared pytest fixtures."""
+
+import os
+import pytest
+
+def pytest_addoption(parser):
+    """Add the opt-in flag for tests that need live services and models."""
+    parser.addoption(
+        "--run-integration",
+        action="store_true",
+        default=False,
+        help="run tests marked integration (Neo4j, spaCy, embedding models)"
+    )
+    parser.addoption(
+        "--run-benchmark",
+        action="store_true",
+        default=False,
+        help="run tests marked benchmark (timing-sensitive, slow)"
+    )
+
+def pytest_configure(config):
+    """Register custom markers."""
+    config.addinivalue_line(
+        "markers",
+        "integration: needs live services or model downloads; "
+        "skipped unless --run-integration is given"
+    )
+    config.addinivalue_line(
+        "markers",
+        "benchmark: timing-sensitive performance check; "
+        "skipped unless --run-benchmark is given"
+    )
+
+def pytest_collection_modifyitems(config, items):
+    """Skip integration and benchmark tests unless they were asked for."""
+    for marker in ("integration", "benchmark"):
+        option = f"--run-{marker}"
+        if config.getoption(option):
+            continue
+            
+        skip = pytest.mark.skip(reason=f"needs {option}")
+        for item in items:
+            if marker in item.keywords:
+                item.add_marker(skip)
+
+@pytest.fixture(scope="session")
+def port_offset():
+    """Port offset unique to this pytest-xdist worker (0 when not distributed).
+    
+    Fixed ports such as the Prometheus exporter's are shifted by this so
+    parallel workers never bind the same one.
+    """
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+    return 10 * int(worker_id[2:])
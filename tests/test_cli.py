@@ -14,9 +14,10 @@ from src.cli import (
     load_config,
     process_documents,
     query_knowledge_base,
+    read_documents,
     main
 )
-from src.main import RAGSystem
+from src.main import RAGSystem, SystemConfig
 from src.llm.rag_manager import RAGResponse
 
 @pytest.fixture
@@ -271,5 +272,40 @@ def test_stdin_handling():
                     system_prompt=None
                 )
 
+def test_read_documents_ndjson():
+    """Test that newline-delimited JSON input is streamed record by record."""
+    stdin_content = '{"text": "Test doc 1"}\n\n{"text": "Test doc 2"}\n'
+    
+    documents = read_documents(StringIO(stdin_content))
+    
+    assert not isinstance(documents, list)
+    assert list(documents) == [{"text": "Test doc 1"}, {"text": "Test doc 2"}]
+    
+    # JSON arrays are still parsed whole
+    documents = read_documents(StringIO('  [{"text": "Test doc"}]'))
+    assert documents == [{"text": "Test doc"}]
+
+def test_metrics_server_precedence():
+    """Test that the metrics server only starts when metrics are enabled."""
+    cases = [
+        (True, True, True),
+        (True, False, False),
+        (False, True, False),
+        (False, False, False)
+    ]
+    for enable_metrics, start_metrics_server, expected in cases:
+        # Bypass __init__ so no models or connections are created
+        system = RAGSystem.__new__(RAGSystem)
+        system.config = SystemConfig(
+            enable_metrics=enable_metrics,
+            start_metrics_server=start_metrics_server
+        )
+        system._monitor = None
+        
+        with patch('src.main.SystemMonitor') as mock_monitor:
+            system.monitor
+            
+        assert mock_monitor.call_args.kwargs["start_metrics_server"] is expected
+
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,47 @@
+"""
+Tests for the content-hash embedding cache.
+"""
+
+import pytest
+import numpy as np
+from unittest.mock import Mock
+
+from src.search.embedding_cache import EmbeddingCache
+
+def fake_encode(texts):
+    """Deterministic stand-in for an embedding model."""
+    return np.array([[len(t), t.count("a")] for t in texts], dtype=np.float32)
+
+def test_encode_only_computes_misses():
+    """Test that cached texts are not re-embedded."""
+    cache = EmbeddingCache()
+    encode_fn = Mock(side_effect=fake_encode)
+
+    first = cache.encode(["alpha", "beta"], encode_fn)
+    second = cache.encode(["beta", "gamma", "alpha"], encode_fn)
+
+    assert encode_fn.call_count == 2
+    assert encode_fn.call_args_list[1][0][0] == ["gamma"]
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[2], first[0])
+
+def test_model_name_separates_entries():
+    """Test that different models never share cached embeddings."""
+    cache = EmbeddingCache()
+
+    assert cache.key("text", "model-a") != cache.key("text", "model-b")
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted."""
+    cache = EmbeddingCache(maxsize=2)
+    cache.put("a", np.zeros(2))
+    cache.put("b", np.ones(2))
+    cache.get("a")
+    cache.put("c", np.ones(2))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+if __name__ == "__main__":
+    pytest.main([__file__])
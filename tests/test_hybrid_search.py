@@ -12,11 +12,17 @@ from src.search.hybrid_search import (
 )
 from src.embeddings.embedding_generator import EmbeddingGenerator
 
-@pytest.fixture
+# Seeded so sample embeddings, and therefore rankings, are reproducible
+_rng = np.random.default_rng(0)
+
+@pytest.fixture(scope="session")
 def embedding_model():
-    return EmbeddingGenerator()
+    """Load the embedding model once per session and warm it up."""
+    model = EmbeddingGenerator()
+    model.encode(["warmup"] * 4)
+    return model
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def search_engine(embedding_model):
     config = SearchConfig(
         vector_weight=0.4,
@@ -31,9 +37,16 @@ def search_engine(embedding_model):
     yield engine
     engine.close()
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_data(search_engine):
-    """Create sample data in Neo4j for testing."""
+    """Create sample data in Neo4j once for the module.
+    
+    Tests only read the graph; any test that writes to it must undo its
+    changes before returning.
+    """
+    embeddings = _rng.random((3, 768), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    
     with search_engine.driver.session() as session:
         # Clear existing data
         session.run("MATCH (n) DETACH DELETE n")
@@ -70,9 +83,9 @@ def sample_data(search_engine):
             CREATE (c3)-[:MENTIONS {confidence: 0.9}]->(e3)
             CREATE (c1)-[:SIMILAR_TO {score: 0.8}]->(c3)
         """, {
-            "emb1": np.random.rand(768).tolist(),
-            "emb2": np.random.rand(768).tolist(),
-            "emb3": np.random.rand(768).tolist()
+            "emb1": embeddings[0].tolist(),
+            "emb2": embeddings[1].tolist(),
+            "emb3": embeddings[2].tolist()
         })
 
 def test_basic_search(search_engine, sample_data):
@@ -239,6 +252,10 @@ def test_community_boost(search_engine, sample_data):
     finally:
         engine_with_boost.close()
         engine_without_boost.close()
+        
+        # Restore the shared sample data
+        with search_engine.driver.session() as session:
+            session.run("MATCH (c:Chunk) REMOVE c.community")
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -6,6 +6,7 @@ import pytest
 import time
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
+from neo4j import GraphDatabase
 from src.monitoring.system_monitor import (
     SystemMonitor,
     PerformanceMetrics,
@@ -13,22 +14,27 @@ from src.monitoring.system_monitor import (
 )
 
 @pytest.fixture
-def monitor():
+def monitor(port_offset):
     """Create a system monitor instance."""
     # Use test Neo4j credentials
     monitor = SystemMonitor(
         neo4j_uri="bolt://localhost:7687",
         neo4j_user="neo4j",
         neo4j_password="password",
-        prometheus_port=8001  # Different port for testing
+        prometheus_port=8001 + port_offset,  # Different port for testing
+        start_metrics_server=False  # Metrics are read from the registry
     )
     yield monitor
     monitor.close()
 
-@pytest.fixture
-def sample_graph_data(monitor):
-    """Create sample graph data for testing."""
-    with monitor.driver.session() as session:
+@pytest.fixture(scope="module")
+def sample_graph_data():
+    """Create sample graph data once for the module's read-only tests."""
+    driver = GraphDatabase.driver(
+        "bolt://localhost:7687",
+        auth=("neo4j", "password")
+    )
+    with driver, driver.session() as session:
         # Clear existing data
         session.run("MATCH (n) DETACH DELETE n")
         
@@ -120,21 +126,21 @@ def test_error_summary(monitor):
     # Add some test errors
     test_errors = [
         {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": time.time_ns(),
             "operation": "op1",
             "error_type": "ValueError",
             "error_message": "Test error 1",
             "latency_ms": 100.0
         },
         {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": time.time_ns(),
             "operation": "op2",
             "error_type": "ValueError",
             "error_message": "Test error 2",
             "latency_ms": 150.0
         },
         {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": time.time_ns(),
             "operation": "op3",
             "error_type": "KeyError",
             "error_message": "Test error 3",
@@ -1,5 +1,6 @@
 """Tests for the proposal matcher component."""
 
+import numpy as np
 import pytest
 from unittest.mock import Mock, patch
 from src.search.proposal_matcher import ProposalMatcher, MatchResult
@@ -8,7 +9,8 @@ from src.search.proposal_matcher import ProposalMatcher, MatchResult
 def embedding_model():
     """Mock embedding model fixture."""
     model = Mock()
-    model.encode.return_value = [0.1] * 768  # Mock 768-dimensional embedding
+    # Mock 768-dimensional embeddings, one row per input text
+    model.encode.side_effect = lambda texts, **kwargs: np.full((len(texts), 768), 0.1)
     return model
 
 @pytest.fixture
@@ -69,6 +71,24 @@ def test_section_similarity_calculation(embedding_model):
     assert matcher._calculate_section_similarity("3.2.1", "") == 0.0
     assert matcher._calculate_section_similarity("", "3.2.1") == 0.0
 
+def test_batched_section_similarity(embedding_model):
+    """Test that batched section scores match the per-pair calculation."""
+    matcher = ProposalMatcher(embedding_model)
+    sections = ["3.2.1", "3.2.2", "3.1.1", "4.1.1", "3.02.1"]
+    
+    for req_section in ["3.2.1", "3.2", "3.2.1.4", "A.2.1"]:
+        batched = matcher._calculate_section_similarities(req_section, sections)
+        expected = [
+            matcher._calculate_section_similarity(req_section, section)
+            for section in sections
+        ]
+        assert list(batched) == pytest.approx(expected)
+    
+    assert len(matcher._calculate_section_similarities("3.2.1", [])) == 0
+    
+    # Parts compare as text, so a zero-padded part is a different section
+    assert matcher._calculate_section_similarity("3.2.1", "3.02.1") == pytest.approx(1 / 3)
+
 @patch('src.search.proposal_matcher.ProposalVectorizer')
 @patch('src.search.proposal_matcher.HybridSearchEngine')
 def test_match_requirement(MockHybridSearch, MockVectorizer, embedding_model, 
@@ -108,6 +128,32 @@ def test_match_requirement(MockHybridSearch, MockVectorizer, embedding_model,
     mock_vectorizer.search.assert_called_once()
     mock_hybrid.search.assert_called_once()
 
+@patch('src.search.proposal_matcher.ProposalVectorizer')
+@patch('src.search.proposal_matcher.HybridSearchEngine')
+def test_proposal_indexed_once(MockHybridSearch, MockVectorizer, embedding_model,
+                               sample_requirement, sample_proposal):
+    """Test that repeated matches against one proposal reuse the index."""
+    mock_vectorizer = MockVectorizer.return_value
+    mock_vectorizer.search.return_value = []
+    mock_vectorizer.search_batch.return_value = [[], []]
+    MockHybridSearch.return_value.search.return_value = []
+    
+    matcher = ProposalMatcher(embedding_model)
+    matcher.match_requirement(sample_requirement, sample_proposal)
+    matcher.match_requirement(sample_requirement, sample_proposal)
+    results = matcher.match_requirements(
+        [sample_requirement, "4.1.1 Another requirement"],
+        sample_proposal
+    )
+    
+    mock_vectorizer.index_proposal.assert_called_once_with(sample_proposal)
+    mock_vectorizer.search_batch.assert_called_once()
+    assert [r.requirement_id for r in results] == ["3.2.1", "4.1.1"]
+    
+    # A different proposal triggers re-indexing
+    matcher.match_requirement(sample_requirement, sample_proposal + " Extra.")
+    assert mock_vectorizer.index_proposal.call_count == 2
+
 def test_match_explanation_generation(embedding_model):
     """Test match explanation generation."""
     matcher = ProposalMatcher(embedding_model)